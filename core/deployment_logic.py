@@ -13,29 +13,264 @@ Phase C: Self-Healing Loop
 """
 
 import os
-import json
+import time
 import asyncio
-from typing import Optional, Tuple
-from datetime import datetime
+import hashlib
+from collections import OrderedDict, deque
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Tuple, List
+from datetime import timedelta
 
+import orjson
 import google.generativeai as genai
+from google.generativeai import caching
 
 from core.schema import (
     RepoMap,
     DeploymentPlan,
     DockerfileSpec,
     TerraformSpec,
-    SecretRequirement,
     ThoughtSignature,
     FixProposal,
-    CodePatch,
     AssistModeMetadata,
     RiskLevel,
-    FileMapping,
-    DependencyInfo,
 )
 
 
+def _strip_fences(text: str) -> str:
+    """Remove a surrounding ```json ... ``` fence from a model response."""
+    text = text.strip()
+    if text[:3] != "```":
+        return text
+    # Body starts after the fence line (```json / ```) and ends at the closing
+    # fence; without one, a ``` inside the body must not truncate it
+    start = text.find("\n") + 1 or (7 if text.startswith("```json") else 3)
+    if text.endswith("```") and len(text) - 3 >= start:
+        return text[start:-3]
+    return text[start:]
+
+
+# Prompt templates, split around their dynamic slots so builders can join
+# the pieces without re-formatting the static text on every call.
+# They stay str: the Gemini SDK only accepts text parts as str (raw bytes are
+# rejected as an invalid Blob) and does the UTF-8 encoding itself.
+_ANALYSIS_PROMPT_HEAD = """ROLE: You are NEURO-SENTINEL, a Sovereign DevOps Agent with expertise in cloud infrastructure, containerization, and application deployment.
+
+MISSION: Analyze the provided codebase and deployment guidelines to create a complete, production-ready infrastructure plan.
+
+=== CODEBASE CONTEXT (1M Token Window) ===
+"""
+_ANALYSIS_PROMPT_MID = "\n\n=== USER DEPLOYMENT GUIDELINES ===\n"
+_ANALYSIS_PROMPT_TAIL = """
+
+=== REQUIRED OUTPUT ===
+Respond with a valid JSON object containing two main sections: "repo_map" and "deployment_plan".
+
+SCHEMA REQUIREMENTS:
+
+1. repo_map:
+   - project_name: string (detected project name)
+   - primary_language: string (main programming language)
+   - framework: string or null (e.g., "FastAPI", "Express", "Django")
+   - entry_point: string (main entry file)
+   - dependency_file: string (e.g., "requirements.txt", "package.json")
+   - dependencies: array of { name: string, version: string|null, source: string }
+   - detected_env_vars: array of strings (environment variables used in code)
+   - detected_ports: array of numbers (ports used in code)
+   - logic_flow: object mapping module names to their responsibilities
+   - total_files: number
+   - total_tokens: number (estimate)
+
+2. deployment_plan:
+   - dockerfile:
+     - base_image: string (e.g., "python:3.12-slim")
+     - build_stage: string (multi-stage build content)
+     - runtime_stage: string (final stage content)
+     - full_content: string (complete Dockerfile)
+     - optimizations_applied: array of strings
+   
+   - terraform:
+     - provider_config: string (GCP provider HCL)
+     - cloud_run_config: string (Cloud Run service HCL)
+     - iam_config: string (Service account and IAM HCL)
+     - secrets_config: string (Secret Manager HCL)
+     - full_content: string (complete Terraform configuration)
+   
+   - secrets_required: array of:
+     - name: string (e.g., "DATABASE_URL")
+     - source_file: string (where detected)
+     - source_line: number
+     - is_critical: boolean
+     - suggested_source: string or null
+   
+   - secrets_missing: array of strings (secrets not yet configured)
+   - estimated_monthly_cost_usd: number
+   - deployment_region: string (default: "us-central1")
+   - service_url_pattern: string (expected Cloud Run URL)
+
+CONSTRAINTS:
+1. Dockerfile MUST use multi-stage builds for optimization
+2. Terraform MUST use least-privilege IAM (only roles/run.admin, roles/secretmanager.secretAccessor, roles/artifactregistry.writer, roles/logging.viewer)
+3. All secrets MUST be sourced from GCP Secret Manager, never hardcoded
+4. Cloud Run MUST have autoscaling configured (min: 0, max: 10)
+5. Health checks MUST be enabled
+
+OUTPUT FORMAT: Pure JSON only, no markdown or explanation. The response must be valid JSON that can be parsed directly.
+"""
+
+_DIAGNOSIS_PROMPT_HEAD = """ROLE: You are NEURO-SENTINEL's Surgical Module, specializing in production error diagnosis and code remediation.
+
+MISSION: Analyze the error in context of the full codebase and propose a minimal, safe fix.
+
+=== CODEBASE CONTEXT ===
+"""
+_DIAGNOSIS_PROMPT_FILE = "\n\n=== ERROR INFORMATION ===\nFile: "
+_DIAGNOSIS_PROMPT_LINE = "\nLine: "
+_DIAGNOSIS_PROMPT_MESSAGE = "\nError Message: "
+_DIAGNOSIS_PROMPT_TRACE = "\n\nStack Trace:\n"
+_DIAGNOSIS_PROMPT_TAIL = """
+
+=== REQUIRED OUTPUT ===
+Respond with a valid JSON object containing a fix proposal.
+
+SCHEMA:
+{
+  "diagnosis": "string - root cause analysis",
+  "confidence_score": number 0-1,
+  "risk_level": "low" | "medium" | "high" | "critical",
+  "patches": [
+    {
+      "file_path": "string",
+      "start_line": number,
+      "end_line": number,
+      "original_content": "string - exact original code",
+      "patched_content": "string - fixed code",
+      "diff": "string - unified diff format"
+    }
+  ],
+  "alternative_fixes": ["string array of other approaches"],
+  "assist_mode": {
+    "what_this_does": "string - plain English explanation for interns",
+    "why_its_needed": "string - context and reasoning",
+    "potential_implications": ["array of side effects and risks"],
+    "learn_more_links": ["array of documentation URLs"]
+  }
+}
+
+CONSTRAINTS:
+1. Propose the MINIMAL fix required
+2. NEVER suggest removing entire functions/classes unless absolutely necessary
+3. Include comprehensive Assist Mode metadata for learning
+4. Confidence score should reflect actual certainty
+5. Risk level must account for downstream effects
+
+OUTPUT FORMAT: Pure JSON only.
+"""
+
+
+# Stands in for the codebase in prompts whose context is served from a
+# Gemini cached-content entry
+_CACHED_CONTEXT_NOTE = "[Full codebase provided above as cached context.]"
+
+# Fallback values merged under Gemini's output before validation
+_REPO_MAP_DEFAULTS = MappingProxyType({
+    "project_name": "unknown",
+    "primary_language": "unknown",
+    "entry_point": "unknown",
+    "dependency_file": "unknown",
+})
+_DEPLOYMENT_PLAN_DEFAULTS = MappingProxyType({
+    "service_url_pattern": "https://PROJECT.run.app",
+})
+_DOCKERFILE_DEFAULTS = MappingProxyType({
+    "base_image": "python:3.12-slim",
+    "build_stage": "",
+    "runtime_stage": "",
+    "full_content": "",
+})
+_TERRAFORM_DEFAULTS = MappingProxyType({
+    "provider_config": "",
+    "cloud_run_config": "",
+    "iam_config": "",
+    "secrets_config": "",
+    "full_content": "",
+})
+_PATCH_DEFAULTS = MappingProxyType({
+    "original_content": "",
+    "patched_content": "",
+    "diff": "",
+})
+_ASSIST_MODE_DEFAULTS = MappingProxyType({
+    "what_this_does": "Applies a code fix",
+    "why_its_needed": "To resolve the detected error",
+})
+
+# Lower-case risk strings from Gemini mapped straight to their enum members
+_RISK_MAP = {risk.value: risk for risk in RiskLevel}
+
+
+@lru_cache(maxsize=1)
+def _hhmmss(second: int) -> str:
+    """UTC HHMMSS for signature IDs, reformatted only when the second changes."""
+    return time.strftime("%H%M%S", time.gmtime(second))
+
+
+def _content_digest(text: str) -> str:
+    """Short stable digest used to key caches on (potentially huge) text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Texts at least this long are hashed in a worker thread
+_DIGEST_THREAD_MIN_CHARS = 1 << 20
+
+
+async def _content_digest_async(text: str) -> str:
+    """_content_digest that keeps multi-megabyte inputs off the event loop."""
+    if len(text) < _DIGEST_THREAD_MIN_CHARS:
+        return _content_digest(text)
+    return await asyncio.to_thread(_content_digest, text)
+
+
+# API key the SDK's default clients were last configured with
+_configured_api_key: Optional[str] = None
+
+
+def _configure(api_key: str):
+    """
+    Configure the SDK only when the key changes.
+    
+    genai.configure discards the SDK's pooled transport clients, so calling it
+    again for the same key would force a fresh channel (and TLS handshake).
+    The key is process-global: every GenerativeModel reads it lazily, so
+    switching keys affects all existing surgeons too.
+    """
+    global _configured_api_key
+    if api_key != _configured_api_key:
+        if _configured_api_key is not None:
+            print("[SovereignSurgeon] Gemini API key changed; all surgeons now use the new key")
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+
+
+@lru_cache(maxsize=8)
+def _get_model(
+    model_name: str,
+    generation_config_items: Tuple[Tuple[str, object], ...]
+) -> genai.GenerativeModel:
+    """
+    Build (once per model/config) the Gemini model shared by all surgeons.
+    
+    Constructing a GenerativeModel binds the schema, so per-request surgeons
+    reuse the cached instance instead. The API key is not part of the key
+    because the model uses whatever _configure last set.
+    """
+    return genai.GenerativeModel(
+        model_name,
+        generation_config=dict(generation_config_items)
+    )
+
+
 class SovereignSurgeon:
     """
     The brain of NEURO-SENTINEL.
@@ -44,6 +279,29 @@ class SovereignSurgeon:
     
     # Model configuration
     MODEL_NAME = "gemini-2.5-pro-preview-06-05"  # Use available Gemini model
+    GENERATION_CONFIG = {
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,
+    }
+    
+    # Upper bound on in-flight Gemini requests for batched calls
+    MAX_CONCURRENT_REQUESTS = 8
+    
+    # Number of (context, guidelines) analyses kept for identical replays
+    ANALYSIS_CACHE_SIZE = 32
+    
+    # Thought signatures retained for the audit trail
+    SIGNATURE_HISTORY_SIZE = 10_000
+    
+    # Contexts at least this large are uploaded once as Gemini cached content
+    CONTEXT_CACHE_MIN_TOKENS = 32_768
+    CONTEXT_CACHE_TTL = timedelta(hours=1)
+    
+    # Seconds to send contexts inline after a failed cache upload (e.g. the
+    # model or tier does not support caching) before trying again
+    CONTEXT_CACHE_RETRY_AFTER = 600.0
     
     def __init__(self, api_key: str):
         """
@@ -52,17 +310,44 @@ class SovereignSurgeon:
         Args:
             api_key: Google AI API key
         """
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
+        _configure(api_key)
+        self.model = _get_model(
             self.MODEL_NAME,
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
+            tuple(sorted(self.GENERATION_CONFIG.items()))
+        )
+        # Bounded audit trail; the counter keeps IDs unique after eviction
+        self.thought_signatures: deque[ThoughtSignature] = deque(
+            maxlen=self.SIGNATURE_HISTORY_SIZE
         )
-        self.thought_signatures: list[ThoughtSignature] = []
+        self._sig_counter = 0
+        # Context digest -> (model bound to the cached content, expiry, cache)
+        self._context_cache: dict[
+            str, Tuple[genai.GenerativeModel, float, caching.CachedContent]
+        ] = {}
+        # Context digest -> lock serializing its upload (see _model_for_context)
+        self._context_locks: dict[str, asyncio.Lock] = {}
+        # Monotonic time before which context caching is not attempted
+        self._context_cache_retry_at = 0.0
+        self._analysis_cache: OrderedDict[
+            Tuple[str, str], Tuple[RepoMap, DeploymentPlan]
+        ] = OrderedDict()
+    
+    async def aclose(self):
+        """
+        Release the Gemini resources held by this surgeon.
+        
+        Context caches uploaded for large codebases are deleted so they stop
+        accruing storage until their TTL runs out.
+        """
+        entries = list(self._context_cache.values())
+        self._context_cache.clear()
+        self._analysis_cache.clear()
+        
+        for _, _, cached_content in entries:
+            try:
+                await asyncio.to_thread(cached_content.delete)
+            except Exception as e:
+                print(f"[SovereignSurgeon] Failed to delete context cache: {e}")
     
     def _create_signature(
         self,
@@ -73,7 +358,8 @@ class SovereignSurgeon:
         tokens: int = 0
     ) -> ThoughtSignature:
         """Create a new thought signature for audit trail."""
-        sig_id = f"SIG-{datetime.utcnow().strftime('%H%M%S')}-{len(self.thought_signatures):03d}"
+        sig_id = f"SIG-{_hhmmss(int(time.time()))}-{self._sig_counter:03d}"
+        self._sig_counter += 1
         sig = ThoughtSignature(
             id=sig_id,
             reasoning_step=reasoning,
@@ -88,7 +374,8 @@ class SovereignSurgeon:
     async def analyze_and_plan(
         self,
         codebase_context: str,
-        guidelines: str
+        guidelines: str,
+        token_estimate: Optional[int] = None
     ) -> Tuple[RepoMap, DeploymentPlan]:
         """
         Analyze codebase and generate deployment plan.
@@ -96,178 +383,214 @@ class SovereignSurgeon:
         Args:
             codebase_context: Full codebase as concatenated string
             guidelines: User's deployment guidelines
+            token_estimate: Token count already known upstream, if any
             
         Returns:
             Tuple of (RepoMap, DeploymentPlan)
         """
+        # Identical replays (CI reruns, dashboard refreshes) skip Gemini
+        context_key = await _content_digest_async(codebase_context)
+        cache_key = (context_key, _content_digest(guidelines))
+        cached = self._analysis_cache.get(cache_key)
+        if cached is not None:
+            self._analysis_cache.move_to_end(cache_key)
+            return cached
+        
+        if token_estimate is None:
+            token_estimate = len(codebase_context) >> 2  # ~4 chars per token
+        
         # Create signature for this analysis
         sig = self._create_signature(
             reasoning="Analyzing codebase structure and generating deployment artifacts",
             action="Full context analysis with Gemini 3 Pro",
             verification="Schema validation of output",
-            tokens=len(codebase_context) // 4
+            tokens=token_estimate
         )
         
         # Build the analysis prompt
-        prompt = self._build_analysis_prompt(codebase_context, guidelines)
+        model, context_slot = await self._model_for_context(
+            codebase_context, token_estimate, context_key
+        )
+        prompt = self._build_analysis_prompt(context_slot, guidelines)
         
         # Call Gemini
-        response = await self.model.generate_content_async(prompt)
+        response_text = await self._generate_text(prompt, model)
         
         # Parse the response
-        result = self._parse_analysis_response(response.text, sig)
+        try:
+            result = self._parse_analysis_response(response_text, sig)
+        except orjson.JSONDecodeError as e:
+            print(f"[SovereignSurgeon] JSON parse error: {e}")
+            print(f"[SovereignSurgeon] Raw response: {response_text[:500]}...")
+            # Return default/empty structures (not cached, so a rerun retries)
+            return self._create_default_response(sig)
+        
+        self._analysis_cache[cache_key] = result
+        if len(self._analysis_cache) > self.ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
         
         return result
     
+    def clear_analysis_cache(self):
+        """Drop cached analyses, e.g. after the ingested repository changed."""
+        self._analysis_cache.clear()
+    
+    async def _model_for_context(
+        self,
+        context: str,
+        token_estimate: int,
+        context_key: Optional[str] = None
+    ) -> Tuple[genai.GenerativeModel, str]:
+        """
+        Pick the model to call and the context text to embed in the prompt.
+        
+        Large contexts are registered once as Gemini cached content; later
+        calls for the same codebase reference it and send only the
+        per-request part of the prompt.
+        
+        Returns:
+            Tuple of (model, text for the prompt's codebase slot)
+        """
+        if (
+            token_estimate < self.CONTEXT_CACHE_MIN_TOKENS
+            or time.monotonic() < self._context_cache_retry_at
+        ):
+            return self.model, context
+        
+        if context_key is None:
+            context_key = await _content_digest_async(context)
+        
+        entry = self._context_cache.get(context_key)
+        if entry is None or entry[1] <= time.monotonic():
+            # Single-flight: concurrent callers for the same context wait for
+            # one upload instead of each creating a billed cached content
+            lock = self._context_locks.setdefault(context_key, asyncio.Lock())
+            try:
+                async with lock:
+                    entry = await self._upload_context(context, context_key)
+            finally:
+                if not lock.locked():
+                    self._context_locks.pop(context_key, None)
+            if entry is None:
+                return self.model, context
+        
+        return entry[0], _CACHED_CONTEXT_NOTE
+    
+    async def _upload_context(
+        self,
+        context: str,
+        context_key: str
+    ) -> Optional[Tuple[genai.GenerativeModel, float, caching.CachedContent]]:
+        """
+        Register context as Gemini cached content unless a fresh entry exists.
+        
+        Must be called with the context's lock held.
+        
+        Returns:
+            The context cache entry, or None if caching is unavailable
+        """
+        now = time.monotonic()
+        entry = self._context_cache.get(context_key)
+        if entry is not None and entry[1] > now:
+            return entry  # Uploaded by the caller that held the lock before us
+        if now < self._context_cache_retry_at:
+            return None  # The caller before us just failed to upload
+        
+        try:
+            cached_content = await asyncio.to_thread(
+                caching.CachedContent.create,
+                model=self.MODEL_NAME,
+                contents=[context],
+                ttl=self.CONTEXT_CACHE_TTL,
+            )
+        except Exception as e:
+            print(f"[SovereignSurgeon] Context caching unavailable, sending inline: {e}")
+            self._context_cache_retry_at = time.monotonic() + self.CONTEXT_CACHE_RETRY_AFTER
+            return None
+        
+        model = genai.GenerativeModel.from_cached_content(
+            cached_content,
+            generation_config=self.GENERATION_CONFIG
+        )
+        # Drop expired entries; refresh a minute ahead of server-side expiry
+        self._context_cache = {
+            k: v for k, v in self._context_cache.items() if v[1] > now
+        }
+        entry = (
+            model,
+            now + self.CONTEXT_CACHE_TTL.total_seconds() - 60,
+            cached_content
+        )
+        self._context_cache[context_key] = entry
+        return entry
+    
+    async def _generate_text(
+        self,
+        prompt: str,
+        model: Optional[genai.GenerativeModel] = None
+    ) -> str:
+        """
+        Stream a Gemini response and return its full text.
+        
+        Chunks are collected as they arrive so large plans are assembled
+        while the rest of the response is still in flight.
+        """
+        model = model or self.model
+        response = await model.generate_content_async(prompt, stream=True)
+        
+        chunks: List[str] = []
+        async for chunk in response:
+            if chunk.candidates and chunk.candidates[0].content.parts:
+                chunks.append(chunk.text)
+        
+        if not chunks:
+            # Surfaces the SDK's error (e.g. blocked prompt) as before
+            return response.text
+        return "".join(chunks)
+    
     def _build_analysis_prompt(self, context: str, guidelines: str) -> str:
         """Build the prompt for codebase analysis."""
-        return f"""ROLE: You are NEURO-SENTINEL, a Sovereign DevOps Agent with expertise in cloud infrastructure, containerization, and application deployment.
-
-MISSION: Analyze the provided codebase and deployment guidelines to create a complete, production-ready infrastructure plan.
-
-=== CODEBASE CONTEXT (1M Token Window) ===
-{context}
-
-=== USER DEPLOYMENT GUIDELINES ===
-{guidelines}
-
-=== REQUIRED OUTPUT ===
-Respond with a valid JSON object containing two main sections: "repo_map" and "deployment_plan".
-
-SCHEMA REQUIREMENTS:
-
-1. repo_map:
-   - project_name: string (detected project name)
-   - primary_language: string (main programming language)
-   - framework: string or null (e.g., "FastAPI", "Express", "Django")
-   - entry_point: string (main entry file)
-   - dependency_file: string (e.g., "requirements.txt", "package.json")
-   - dependencies: array of {{ name: string, version: string|null, source: string }}
-   - detected_env_vars: array of strings (environment variables used in code)
-   - detected_ports: array of numbers (ports used in code)
-   - logic_flow: object mapping module names to their responsibilities
-   - total_files: number
-   - total_tokens: number (estimate)
-
-2. deployment_plan:
-   - dockerfile:
-     - base_image: string (e.g., "python:3.12-slim")
-     - build_stage: string (multi-stage build content)
-     - runtime_stage: string (final stage content)
-     - full_content: string (complete Dockerfile)
-     - optimizations_applied: array of strings
-   
-   - terraform:
-     - provider_config: string (GCP provider HCL)
-     - cloud_run_config: string (Cloud Run service HCL)
-     - iam_config: string (Service account and IAM HCL)
-     - secrets_config: string (Secret Manager HCL)
-     - full_content: string (complete Terraform configuration)
-   
-   - secrets_required: array of:
-     - name: string (e.g., "DATABASE_URL")
-     - source_file: string (where detected)
-     - source_line: number
-     - is_critical: boolean
-     - suggested_source: string or null
-   
-   - secrets_missing: array of strings (secrets not yet configured)
-   - estimated_monthly_cost_usd: number
-   - deployment_region: string (default: "us-central1")
-   - service_url_pattern: string (expected Cloud Run URL)
-
-CONSTRAINTS:
-1. Dockerfile MUST use multi-stage builds for optimization
-2. Terraform MUST use least-privilege IAM (only roles/run.admin, roles/secretmanager.secretAccessor, roles/artifactregistry.writer, roles/logging.viewer)
-3. All secrets MUST be sourced from GCP Secret Manager, never hardcoded
-4. Cloud Run MUST have autoscaling configured (min: 0, max: 10)
-5. Health checks MUST be enabled
-
-OUTPUT FORMAT: Pure JSON only, no markdown or explanation. The response must be valid JSON that can be parsed directly.
-"""
+        return "".join((
+            _ANALYSIS_PROMPT_HEAD,
+            context,
+            _ANALYSIS_PROMPT_MID,
+            guidelines,
+            _ANALYSIS_PROMPT_TAIL,
+        ))
 
     def _parse_analysis_response(
         self,
         response_text: str,
         signature: ThoughtSignature
     ) -> Tuple[RepoMap, DeploymentPlan]:
-        """Parse the Gemini response into structured objects."""
-        try:
-            # Clean up response if needed
-            text = response_text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            data = json.loads(text)
-            
-            # Parse RepoMap
-            rm_data = data.get("repo_map", {})
-            repo_map = RepoMap(
-                project_name=rm_data.get("project_name", "unknown"),
-                primary_language=rm_data.get("primary_language", "unknown"),
-                framework=rm_data.get("framework"),
-                entry_point=rm_data.get("entry_point", "unknown"),
-                dependency_file=rm_data.get("dependency_file", "unknown"),
-                dependencies=[
-                    DependencyInfo(**dep) for dep in rm_data.get("dependencies", [])
-                ],
-                file_mappings=[
-                    FileMapping(**fm) for fm in rm_data.get("file_mappings", [])
-                ],
-                total_files=rm_data.get("total_files", 0),
-                total_tokens=rm_data.get("total_tokens", 0),
-                logic_flow=rm_data.get("logic_flow", {}),
-                detected_env_vars=rm_data.get("detected_env_vars", []),
-                detected_ports=rm_data.get("detected_ports", [])
-            )
-            
-            # Parse DeploymentPlan
-            dp_data = data.get("deployment_plan", {})
-            
-            dockerfile_data = dp_data.get("dockerfile", {})
-            dockerfile = DockerfileSpec(
-                base_image=dockerfile_data.get("base_image", "python:3.12-slim"),
-                build_stage=dockerfile_data.get("build_stage", ""),
-                runtime_stage=dockerfile_data.get("runtime_stage", ""),
-                full_content=dockerfile_data.get("full_content", ""),
-                optimizations_applied=dockerfile_data.get("optimizations_applied", [])
-            )
-            
-            terraform_data = dp_data.get("terraform", {})
-            terraform = TerraformSpec(
-                provider_config=terraform_data.get("provider_config", ""),
-                cloud_run_config=terraform_data.get("cloud_run_config", ""),
-                iam_config=terraform_data.get("iam_config", ""),
-                secrets_config=terraform_data.get("secrets_config", ""),
-                full_content=terraform_data.get("full_content", "")
-            )
-            
-            secrets_required = [
-                SecretRequirement(**sr) for sr in dp_data.get("secrets_required", [])
-            ]
-            
-            deployment_plan = DeploymentPlan(
-                dockerfile=dockerfile,
-                terraform=terraform,
-                secrets_required=secrets_required,
-                secrets_missing=dp_data.get("secrets_missing", []),
-                estimated_monthly_cost_usd=dp_data.get("estimated_monthly_cost_usd", 0.0),
-                deployment_region=dp_data.get("deployment_region", "us-central1"),
-                service_url_pattern=dp_data.get("service_url_pattern", "https://PROJECT.run.app"),
-                thought_signatures=[signature]
-            )
-            
-            return repo_map, deployment_plan
-            
-        except json.JSONDecodeError as e:
-            print(f"[SovereignSurgeon] JSON parse error: {e}")
-            print(f"[SovereignSurgeon] Raw response: {response_text[:500]}...")
-            # Return default/empty structures
-            return self._create_default_response(signature)
+        """
+        Parse the Gemini response into structured objects.
+        
+        Raises:
+            orjson.JSONDecodeError: If the response is not valid JSON
+        """
+        # Clean up response if needed
+        text = _strip_fences(response_text)
+        
+        data = orjson.loads(text)
+        
+        # Parse RepoMap (validated in a single pydantic-core pass)
+        repo_map = RepoMap.model_validate({
+            **_REPO_MAP_DEFAULTS,
+            **data.get("repo_map", {}),
+        })
+        
+        # Parse DeploymentPlan
+        dp_data = data.get("deployment_plan", {})
+        deployment_plan = DeploymentPlan.model_validate({
+            **_DEPLOYMENT_PLAN_DEFAULTS,
+            **dp_data,
+            "dockerfile": {**_DOCKERFILE_DEFAULTS, **dp_data.get("dockerfile", {})},
+            "terraform": {**_TERRAFORM_DEFAULTS, **dp_data.get("terraform", {})},
+            "thought_signatures": [signature],
+        })
+        
+        return repo_map, deployment_plan
     
     def _create_default_response(
         self,
@@ -311,7 +634,9 @@ OUTPUT FORMAT: Pure JSON only, no markdown or explanation. The response must be
         stack_trace: str,
         error_message: str,
         affected_file: str,
-        affected_line: int
+        affected_line: int,
+        token_estimate: Optional[int] = None,
+        context_key: Optional[str] = None
     ) -> FixProposal:
         """
         Diagnose an error and generate a fix proposal.
@@ -322,27 +647,89 @@ OUTPUT FORMAT: Pure JSON only, no markdown or explanation. The response must be
             error_message: The error message
             affected_file: File where the error occurred
             affected_line: Line number of the error
+            token_estimate: Token count already known upstream, if any
+            context_key: Digest of codebase_context already known upstream, if any
             
         Returns:
             FixProposal with HITL approval required
         """
+        if token_estimate is None:
+            token_estimate = len(codebase_context) >> 2  # ~4 chars per token
+        
+        model, context_slot = await self._model_for_context(
+            codebase_context, token_estimate, context_key
+        )
+        return await self._diagnose_with_model(
+            model, context_slot, token_estimate,
+            stack_trace, error_message, affected_file, affected_line
+        )
+    
+    async def _diagnose_with_model(
+        self,
+        model: genai.GenerativeModel,
+        context_slot: str,
+        token_estimate: int,
+        stack_trace: str,
+        error_message: str,
+        affected_file: str,
+        affected_line: int
+    ) -> FixProposal:
+        """Diagnose one error with an already resolved model and context slot."""
         sig = self._create_signature(
             reasoning=f"Diagnosing error in {affected_file}:{affected_line}",
             action="Cross-referencing stack trace with codebase context",
             verification="Patch validation and type checking",
             risk=RiskLevel.MEDIUM,
-            tokens=len(codebase_context) // 4
+            tokens=token_estimate
         )
         
         prompt = self._build_diagnosis_prompt(
-            codebase_context, stack_trace, error_message, affected_file, affected_line
+            context_slot, stack_trace, error_message, affected_file, affected_line
+        )
+        
+        response_text = await self._generate_text(prompt, model)
+        
+        # Parsing large responses is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(
+            self._parse_diagnosis_response,
+            response_text, stack_trace, error_message, affected_file, affected_line, sig
         )
+    
+    async def diagnose_errors_batch(
+        self,
+        codebase_context: str,
+        errors: List[dict],
+        token_estimate: Optional[int] = None
+    ) -> List[FixProposal]:
+        """
+        Diagnose several errors concurrently against the same codebase.
         
-        response = await self.model.generate_content_async(prompt)
+        Args:
+            codebase_context: Full codebase as concatenated string
+            errors: One dict per error with the stack_trace, error_message,
+                affected_file and affected_line arguments of diagnose_error
+            token_estimate: Token count already known upstream, if any
+            
+        Returns:
+            FixProposals in the same order as errors
+        """
+        if token_estimate is None:
+            token_estimate = len(codebase_context) >> 2
         
-        return self._parse_diagnosis_response(
-            response.text, stack_trace, error_message, affected_file, affected_line, sig
+        # Resolve (and, for large contexts, upload) the shared context once
+        model, context_slot = await self._model_for_context(
+            codebase_context, token_estimate
         )
+        
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        
+        async def diagnose(error: dict) -> FixProposal:
+            async with semaphore:
+                return await self._diagnose_with_model(
+                    model, context_slot, token_estimate, **error
+                )
+        
+        return list(await asyncio.gather(*(diagnose(error) for error in errors)))
     
     def _build_diagnosis_prompt(
         self,
@@ -353,57 +740,19 @@ OUTPUT FORMAT: Pure JSON only, no markdown or explanation. The response must be
         affected_line: int
     ) -> str:
         """Build the prompt for error diagnosis."""
-        return f"""ROLE: You are NEURO-SENTINEL's Surgical Module, specializing in production error diagnosis and code remediation.
-
-MISSION: Analyze the error in context of the full codebase and propose a minimal, safe fix.
-
-=== CODEBASE CONTEXT ===
-{context}
-
-=== ERROR INFORMATION ===
-File: {affected_file}
-Line: {affected_line}
-Error Message: {error_message}
-
-Stack Trace:
-{stack_trace}
-
-=== REQUIRED OUTPUT ===
-Respond with a valid JSON object containing a fix proposal.
-
-SCHEMA:
-{{
-  "diagnosis": "string - root cause analysis",
-  "confidence_score": number 0-1,
-  "risk_level": "low" | "medium" | "high" | "critical",
-  "patches": [
-    {{
-      "file_path": "string",
-      "start_line": number,
-      "end_line": number,
-      "original_content": "string - exact original code",
-      "patched_content": "string - fixed code",
-      "diff": "string - unified diff format"
-    }}
-  ],
-  "alternative_fixes": ["string array of other approaches"],
-  "assist_mode": {{
-    "what_this_does": "string - plain English explanation for interns",
-    "why_its_needed": "string - context and reasoning",
-    "potential_implications": ["array of side effects and risks"],
-    "learn_more_links": ["array of documentation URLs"]
-  }}
-}}
-
-CONSTRAINTS:
-1. Propose the MINIMAL fix required
-2. NEVER suggest removing entire functions/classes unless absolutely necessary
-3. Include comprehensive Assist Mode metadata for learning
-4. Confidence score should reflect actual certainty
-5. Risk level must account for downstream effects
-
-OUTPUT FORMAT: Pure JSON only.
-"""
+        return "".join((
+            _DIAGNOSIS_PROMPT_HEAD,
+            context,
+            _DIAGNOSIS_PROMPT_FILE,
+            affected_file,
+            _DIAGNOSIS_PROMPT_LINE,
+            str(affected_line),
+            _DIAGNOSIS_PROMPT_MESSAGE,
+            error_message,
+            _DIAGNOSIS_PROMPT_TRACE,
+            stack_trace,
+            _DIAGNOSIS_PROMPT_TAIL,
+        ))
 
     def _parse_diagnosis_response(
         self,
@@ -416,60 +765,41 @@ OUTPUT FORMAT: Pure JSON only.
     ) -> FixProposal:
         """Parse the diagnosis response into a FixProposal."""
         try:
-            text = response_text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
+            text = _strip_fences(response_text)
             
-            data = json.loads(text)
+            data = orjson.loads(text)
             
-            patches = [
-                CodePatch(
-                    file_path=p.get("file_path", affected_file),
-                    start_line=p.get("start_line", affected_line),
-                    end_line=p.get("end_line", affected_line),
-                    original_content=p.get("original_content", ""),
-                    patched_content=p.get("patched_content", ""),
-                    diff=p.get("diff", "")
-                )
-                for p in data.get("patches", [])
-            ]
-            
-            assist_data = data.get("assist_mode", {})
-            assist_mode = AssistModeMetadata(
-                what_this_does=assist_data.get("what_this_does", "Applies a code fix"),
-                why_its_needed=assist_data.get("why_its_needed", "To resolve the detected error"),
-                potential_implications=assist_data.get("potential_implications", []),
-                learn_more_links=assist_data.get("learn_more_links", [])
-            )
+            patch_defaults = {
+                **_PATCH_DEFAULTS,
+                "file_path": affected_file,
+                "start_line": affected_line,
+                "end_line": affected_line,
+            }
+            patches = [{**patch_defaults, **p} for p in data.get("patches", [])]
             
-            risk_str = data.get("risk_level", "low").lower()
-            risk_level = RiskLevel(risk_str) if risk_str in ["low", "medium", "high", "critical"] else RiskLevel.LOW
+            risk_level = _RISK_MAP.get(data.get("risk_level", "low").lower(), RiskLevel.LOW)
             
-            return FixProposal(
-                id=f"fix-{datetime.utcnow().timestamp()}",
-                error_type=error_message.split(":")[0] if ":" in error_message else "Error",
-                error_message=error_message,
-                stack_trace=stack_trace,
-                affected_file=affected_file,
-                affected_line=affected_line,
-                diagnosis=data.get("diagnosis", "Analysis complete"),
-                confidence_score=data.get("confidence_score", 0.8),
-                risk_level=risk_level,
-                patches=patches,
-                alternative_fixes=data.get("alternative_fixes", []),
-                assist_mode=assist_mode,
-                thought_signature=signature
-            )
+            return FixProposal.model_validate({
+                "id": f"fix-{time.time_ns()}",
+                "error_type": error_message.split(":")[0] if ":" in error_message else "Error",
+                "error_message": error_message,
+                "stack_trace": stack_trace,
+                "affected_file": affected_file,
+                "affected_line": affected_line,
+                "diagnosis": data.get("diagnosis", "Analysis complete"),
+                "confidence_score": data.get("confidence_score", 0.8),
+                "risk_level": risk_level,
+                "patches": patches,
+                "alternative_fixes": data.get("alternative_fixes", []),
+                "assist_mode": {**_ASSIST_MODE_DEFAULTS, **data.get("assist_mode", {})},
+                "thought_signature": signature,
+            })
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"[SovereignSurgeon] Diagnosis parse error: {e}")
             # Return a default fix proposal
             return FixProposal(
-                id=f"fix-{datetime.utcnow().timestamp()}",
+                id=f"fix-{time.time_ns()}",
                 error_type="ParseError",
                 error_message=error_message,
                 stack_trace=stack_trace,
@@ -498,7 +828,8 @@ OUTPUT FORMAT: Pure JSON only.
         Generates deployment specifications as JSON string.
         """
         repo_map, deployment_plan = await self.analyze_and_plan(repo_context, guidelines)
-        return json.dumps({
-            "repo_map": repo_map.model_dump(),
-            "deployment_plan": deployment_plan.model_dump()
-        }, indent=2, default=str)
\ No newline at end of file
+        # Serialize each model in pydantic-core rather than via intermediate dicts
+        return (
+            f'{{"repo_map": {repo_map.model_dump_json()}, '
+            f'"deployment_plan": {deployment_plan.model_dump_json()}}}'
+        )
\ No newline at end of file
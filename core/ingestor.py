@@ -8,18 +8,213 @@ Phase A: Deep Ingestion
 """
 
 import os
+import re
+import ast
+import gzip
+import mmap
 import shutil
+import tempfile
 import asyncio
+import threading
+import multiprocessing
+from functools import lru_cache
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Set
+from typing import Optional, Iterator, List, Set, Tuple
 from datetime import datetime
 
 import git
 from git import Repo
+import orjson
 
 from core.schema import RepoMap, FileMapping, DependencyInfo, UserGuidelines
 
 
+def _compile_framework_matcher(
+    frameworks: dict[str, List[str]]
+) -> Tuple[re.Pattern, Tuple[str, ...], Tuple[int, ...]]:
+    """
+    Combine framework signatures into a single alternation.
+    
+    Args:
+        frameworks: Signature patterns by framework name, in priority order
+        
+    Returns:
+        Tuple of (combined regex, framework names, priority rank of the
+        framework behind each alternative, indexed by match.lastindex - 1)
+    """
+    alternatives = [
+        (rank, pattern)
+        for rank, patterns in enumerate(frameworks.values())
+        for pattern in patterns
+    ]
+    regex = re.compile("|".join(f"(?P<fw{i}>{pattern})" for i, (_, pattern) in enumerate(alternatives)))
+    return regex, tuple(frameworks), tuple(rank for rank, _ in alternatives)
+
+
+class _EnvPortVisitor(ast.NodeVisitor):
+    """
+    Collect environment variable names and port numbers from a Python AST.
+    
+    Recognizes os.environ['X'], os.environ.get('X') and os.getenv('X'), plus
+    bare environ/getenv names imported from os; integer literals assigned to
+    a name, keyword argument or dict key containing 'port'; and ':NNNN' in
+    URL-like string literals. Other environs (WSGI, Flask, Socket.IO request
+    environs) are not environment variables and are ignored.
+    """
+    
+    URL_PORT = re.compile(r":(\d{4,5})(?:/|$)")
+    
+    def __init__(self):
+        self.envs: Set[str] = set()
+        self.ports: Set[int] = set()
+        # Local names bound to the os module, and to os.environ / os.getenv
+        # via "from os import ..."; imports precede their use in source order
+        self._os_names: Set[str] = {'os'}
+        self._environ_names: Set[str] = set()
+        self._getenv_names: Set[str] = set()
+    
+    @staticmethod
+    def _string(node: Optional[ast.AST]) -> Optional[str]:
+        """Get the value of a string literal node."""
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        return None
+    
+    def _is_os_attr(self, node: ast.AST, attr: str) -> bool:
+        """Check for os.<attr> (including an aliased os module)."""
+        return (
+            isinstance(node, ast.Attribute)
+            and node.attr == attr
+            and isinstance(node.value, ast.Name)
+            and node.value.id in self._os_names
+        )
+    
+    def _is_environ(self, node: ast.AST) -> bool:
+        """Check for os.environ or an environ name imported from os."""
+        return self._is_os_attr(node, 'environ') or (
+            isinstance(node, ast.Name) and node.id in self._environ_names
+        )
+    
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            if alias.name == 'os':
+                self._os_names.add(alias.asname or 'os')
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module == 'os' and not node.level:
+            for alias in node.names:
+                if alias.name == 'environ':
+                    self._environ_names.add(alias.asname or alias.name)
+                elif alias.name == 'getenv':
+                    self._getenv_names.add(alias.asname or alias.name)
+    
+    def _visit_function(self, node: ast.AST):
+        """Visit a function body with parameters shadowing imported names."""
+        args = node.args
+        params = {a.arg for a in (*args.posonlyargs, *args.args, *args.kwonlyargs)}
+        params.update(a.arg for a in (args.vararg, args.kwarg) if a is not None)
+        shadowed_environ = self._environ_names & params
+        shadowed_getenv = self._getenv_names & params
+        self._environ_names -= shadowed_environ
+        self._getenv_names -= shadowed_getenv
+        self.generic_visit(node)
+        self._environ_names |= shadowed_environ
+        self._getenv_names |= shadowed_getenv
+    
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _visit_function
+    
+    def _add_port(self, node: Optional[ast.AST], name: Optional[str]):
+        """Record an integer literal bound to a port-like name."""
+        if (
+            name is not None
+            and 'port' in name.lower()
+            and isinstance(node, ast.Constant)
+            and type(node.value) is int
+            and 1024 <= node.value <= 65535  # Valid port range
+        ):
+            self.ports.add(node.value)
+    
+    def visit_Subscript(self, node: ast.Subscript):
+        if self._is_environ(node.value):
+            name = self._string(node.slice)
+            if name:
+                self.envs.add(name)
+        self.generic_visit(node)
+    
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        is_lookup = (
+            self._is_os_attr(func, 'getenv')
+            or (isinstance(func, ast.Attribute) and func.attr == 'get' and self._is_environ(func.value))
+            or (isinstance(func, ast.Name) and func.id in self._getenv_names)
+        )
+        if is_lookup and node.args:
+            name = self._string(node.args[0])
+            if name:
+                self.envs.add(name)
+                # e.g. os.getenv("PORT", 8000)
+                if len(node.args) > 1:
+                    self._add_port(node.args[1], name)
+        
+        for keyword in node.keywords:
+            self._add_port(keyword.value, keyword.arg)
+        self.generic_visit(node)
+    
+    def visit_Assign(self, node: ast.Assign):
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                self._add_port(node.value, target.id)
+        self.generic_visit(node)
+    
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if isinstance(node.target, ast.Name):
+            self._add_port(node.value, node.target.id)
+        self.generic_visit(node)
+    
+    def visit_Dict(self, node: ast.Dict):
+        for key, value in zip(node.keys, node.values):
+            self._add_port(value, self._string(key))
+        self.generic_visit(node)
+    
+    def visit_Constant(self, node: ast.Constant):
+        if isinstance(node.value, str) and ':' in node.value:
+            for match in self.URL_PORT.finditer(node.value):
+                port = int(match.group(1))
+                if 1024 <= port <= 65535:
+                    self.ports.add(port)
+
+
+# ast.parse is not safe to run concurrently on some CPython releases
+# (gh-106905: "AST constructor recursion depth mismatch"), so parses on the
+# read thread pool are serialized. Parsing holds the GIL either way.
+_AST_PARSE_LOCK = threading.Lock()
+
+# Scanner used by _process_file in pool workers. The read and scan helpers
+# only use class constants, so an uninitialized instance is sufficient.
+_worker_ingestor: Optional["RepositoryIngestor"] = None
+
+# Pool workers must not be forked from the multi-threaded server: a child
+# could inherit _AST_PARSE_LOCK (or another lock) held by a sibling thread
+# and block forever
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _process_file(
+    path: str,
+    file_name: str,
+    language: str
+) -> Optional[Tuple[str, Set[str], Set[int], bool]]:
+    """Read and scan one file inside a ProcessPoolExecutor worker."""
+    global _worker_ingestor
+    if _worker_ingestor is None:
+        _worker_ingestor = RepositoryIngestor.__new__(RepositoryIngestor)
+    return _worker_ingestor._read_and_scan(path, file_name, language)
+
+
 class RepositoryIngestor:
     """
     Ingests a GitHub repository and builds a comprehensive context
@@ -27,7 +222,7 @@ class RepositoryIngestor:
     """
     
     # Default directories/files to ignore
-    DEFAULT_IGNORE: Set[str] = {
+    DEFAULT_IGNORE: frozenset[str] = frozenset({
         '.git',
         '__pycache__',
         'node_modules',
@@ -48,16 +243,62 @@ class RepositoryIngestor:
         '*.egg-info',
         '.DS_Store',
         'Thumbs.db',
-    }
+    })
+    
+    # DEFAULT_IGNORE split into exact names and '*.ext' suffixes, so each
+    # check is a set lookup plus a single str.endswith call
+    IGNORE_NAMES: frozenset[str] = frozenset(
+        pattern for pattern in DEFAULT_IGNORE if not pattern.startswith('*')
+    )
+    IGNORE_SUFFIXES: Tuple[str, ...] = tuple(
+        pattern[1:] for pattern in DEFAULT_IGNORE if pattern.startswith('*')
+    )
     
     # File extensions to include
-    CODE_EXTENSIONS: Set[str] = {
+    CODE_EXTENSIONS: frozenset[str] = frozenset({
         '.py', '.js', '.ts', '.tsx', '.jsx', '.java', '.go', '.rs',
         '.rb', '.php', '.c', '.cpp', '.h', '.hpp', '.cs', '.swift',
         '.kt', '.scala', '.vue', '.svelte', '.html', '.css', '.scss',
         '.sass', '.less', '.sql', '.sh', '.bash', '.zsh', '.ps1',
         '.yaml', '.yml', '.json', '.toml', '.ini', '.cfg', '.conf',
         '.md', '.rst', '.txt', '.dockerfile', '.tf', '.hcl',
+    })
+    
+    # Code files without an extension (matched case-insensitively)
+    SPECIAL_CODE_FILES: frozenset[str] = frozenset({
+        'dockerfile', 'makefile', 'rakefile', 'gemfile', 'procfile',
+    })
+    
+    # Programming language by file extension
+    LANGUAGE_MAP: dict[str, str] = {
+        '.py': 'python',
+        '.js': 'javascript',
+        '.ts': 'typescript',
+        '.tsx': 'typescript',
+        '.jsx': 'javascript',
+        '.java': 'java',
+        '.go': 'go',
+        '.rs': 'rust',
+        '.rb': 'ruby',
+        '.php': 'php',
+        '.c': 'c',
+        '.cpp': 'cpp',
+        '.cs': 'csharp',
+        '.swift': 'swift',
+        '.kt': 'kotlin',
+        '.scala': 'scala',
+        '.vue': 'vue',
+        '.svelte': 'svelte',
+        '.html': 'html',
+        '.css': 'css',
+        '.sql': 'sql',
+        '.sh': 'shell',
+        '.yaml': 'yaml',
+        '.yml': 'yaml',
+        '.json': 'json',
+        '.tf': 'terraform',
+        '.hcl': 'hcl',
+        '.md': 'markdown',
     }
     
     # Dependency files for different languages
@@ -77,6 +318,48 @@ class RepositoryIngestor:
         'composer.json': 'php',
     }
     
+    # Default on-disk workspace; replaced by a tmpfs directory when available
+    DEFAULT_WORKSPACE: str = "./workspace"
+    TMPFS_ROOT: str = "/dev/shm"
+    
+    # Persistent ingest cache, keyed by repository name and HEAD commit.
+    # Bump INGEST_CACHE_VERSION whenever the ingest output changes shape.
+    DEFAULT_CACHE_DIR: str = "~/.cache/neuro-sentinel"
+    INGEST_CACHE_VERSION: int = 3
+    
+    # Disk cache limits; least recently used entries are evicted first
+    CACHE_MAX_ENTRIES_PER_REPO: int = 3
+    CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    
+    # Minimum free space on the tmpfs before it is used (Docker defaults
+    # /dev/shm to 64 MiB, which is too small for most repositories)
+    TMPFS_MIN_FREE_BYTES: int = 512 * 1024 * 1024
+    
+    # Signal scanning only looks at the head and tail of each file, where
+    # imports, env lookups and port settings live; minified files are skipped
+    SCAN_HEAD_CHARS: int = 16 * 1024
+    SCAN_TAIL_CHARS: int = 4 * 1024
+    MINIFIED_LINE_LENGTH: int = 5000
+    MINIFIED_SAMPLE_LINES: int = 50
+    
+    # Python files up to this size are parsed with ast for env vars and ports
+    AST_MAX_CHARS: int = 512 * 1024
+    
+    # Repositories with at least this many files are read and scanned in a
+    # process pool instead of the read thread pool
+    PROCESS_POOL_MIN_FILES: int = 2000
+    
+    # Only the tip tree is analyzed, so skip history, tags and other branches
+    CLONE_OPTIONS: List[str] = [
+        '--depth=1',
+        '--single-branch',
+        '--filter=blob:none',
+        '--no-tags',
+    ]
+    
+    # Files at least this large are read through mmap instead of os.read
+    MMAP_THRESHOLD: int = 64 * 1024
+    
     # Entry point patterns for different languages
     ENTRY_POINTS: dict[str, List[str]] = {
         'python': ['main.py', 'app.py', 'run.py', 'server.py', '__main__.py', 'manage.py', 'wsgi.py'],
@@ -86,27 +369,133 @@ class RepositoryIngestor:
         'java': ['Main.java', 'Application.java'],
     }
     
-    def __init__(self, repo_url: str, workspace_dir: str = "./workspace"):
+    # Environment variable and port signatures as (kind, pattern). Each
+    # pattern has exactly one capture group holding the value.
+    SIGNAL_PATTERNS: Tuple[Tuple[str, str], ...] = (
+        ('env', r"os\.environ\[[\'\"](\w+)[\'\"]\]"),
+        ('env', r"os\.getenv\([\'\"](\w+)[\'\"]"),
+        ('env', r"process\.env\.(\w+)"),  # JavaScript
+        ('env', r"ENV\[[\'\"](\w+)[\'\"]\]"),  # Ruby
+        ('env', r"getenv\([\'\"](\w+)[\'\"]"),  # PHP
+        ('port', r"(?i:port\s*[=:]\s*(\d{4,5}))"),
+        ('port', r"(?i:listen\((\d{4,5}))"),
+        ('port', r":(\d{4,5})[/\"\']"),
+    )
+    
+    # All signatures as one alternation so each file is scanned once;
+    # match.lastindex identifies which SIGNAL_PATTERNS entry matched
+    SIGNAL_REGEX: re.Pattern = re.compile(
+        "|".join(f"(?:{pattern})" for _, pattern in SIGNAL_PATTERNS)
+    )
+    
+    # Framework signatures per language, in priority order
+    FRAMEWORK_PATTERNS: dict[str, dict[str, List[str]]] = {
+        'python': {
+            'FastAPI': [r'from fastapi import', r'FastAPI\('],
+            'Flask': [r'from flask import', r'Flask\(__name__\)'],
+            'Django': [r'from django', r'DJANGO_SETTINGS_MODULE'],
+        },
+        'javascript': {
+            'Express': [r'require\([\'"]express[\'"]\)', r'from [\'"]express[\'"]'],
+            'Next.js': [r'from [\'"]next', r'next/'],
+            'React': [r'from [\'"]react[\'"]', r'import React'],
+            'Vue': [r'from [\'"]vue[\'"]', r'createApp'],
+        },
+        'vue': {
+            'Vue': [r'from [\'"]vue[\'"]', r'createApp'],
+        },
+        'java': {
+            'Spring': [r'@SpringBootApplication', r'springframework'],
+        },
+        'go': {
+            'Gin': [r'github.com/gin-gonic/gin'],
+        },
+        'rust': {
+            'Actix': [r'actix_web', r'actix-web'],
+        },
+    }
+    FRAMEWORK_PATTERNS['typescript'] = FRAMEWORK_PATTERNS['javascript']
+    
+    # One combined matcher per language; files in other languages are not scanned
+    FRAMEWORK_MATCHERS: dict[str, Tuple[re.Pattern, Tuple[str, ...], Tuple[int, ...]]] = {
+        language: _compile_framework_matcher(frameworks)
+        for language, frameworks in FRAMEWORK_PATTERNS.items()
+    }
+    
+    def __init__(
+        self,
+        repo_url: str,
+        workspace_dir: str = DEFAULT_WORKSPACE,
+        parallel_reads: int = 16,
+        branch: Optional[str] = None,
+        use_tmpfs: bool = True,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR
+    ):
         """
         Initialize the repository ingestor.
         
         Args:
             repo_url: GitHub repository URL
             workspace_dir: Local directory for cloning
+            parallel_reads: Number of threads used to read repository files
+            branch: Branch to clone (defaults to the remote's HEAD)
+            use_tmpfs: Clone into a RAM-backed tmpfs instead of the default
+                workspace when one is available, so ingestion never touches
+                persistent storage. Ignored for an explicit workspace_dir.
+            cache_dir: Directory for the on-disk ingest cache keyed by commit
+                SHA, or None to disable it
         """
         self.repo_url = repo_url
         self.workspace_dir = Path(workspace_dir)
+        # Per-process tmpfs workspace, removed by cleanup() once empty
+        self._owns_workspace = False
+        if use_tmpfs and workspace_dir == self.DEFAULT_WORKSPACE and self._tmpfs_available():
+            self.workspace_dir = Path(self.TMPFS_ROOT) / f"neuro-sentinel-{os.getpid()}"
+            self._owns_workspace = True
+        self.parallel_reads = parallel_reads
+        self.branch = branch
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
         self.repo_name = self._extract_repo_name(repo_url)
+        # Replaced on clone by a directory unique to this ingestor, so
+        # concurrent ingestors of the same repository never share a checkout
         self.repo_path = self.workspace_dir / self.repo_name
+        self._owns_repo_path = False
         self._repo: Optional[Repo] = None
-        self._context_cache: Optional[str] = None
+        self._ingest_cache: Optional[Tuple[List[Tuple[str, str, str]], RepoMap]] = None
+        # Relative paths whose CRs were rewritten to LF while reading; their
+        # ingested text differs from the bytes on disk (see write_context_to)
+        self._cr_normalized: Set[str] = set()
+        self._context: Optional[str] = None
+        self._ingest_lock = threading.Lock()
+        self._ingest_task: Optional[asyncio.Task] = None
+        
+    def _tmpfs_available(self) -> bool:
+        """Check whether the tmpfs root exists and has enough free space."""
+        if not os.path.isdir(self.TMPFS_ROOT):
+            return False
+        try:
+            return shutil.disk_usage(self.TMPFS_ROOT).free >= self.TMPFS_MIN_FREE_BYTES
+        except OSError:
+            return False
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _extract_repo_name(url: str) -> str:
+        """
+        Extract repository name from URL.
         
-    def _extract_repo_name(self, url: str) -> str:
-        """Extract repository name from URL."""
-        # Handle both HTTPS and SSH URLs
-        if url.endswith('.git'):
-            url = url[:-4]
-        return url.split('/')[-1]
+        Raises:
+            ValueError: If the name would resolve to the workspace or its
+                parent, which clone and cleanup would then delete
+        """
+        # Handle both HTTPS and SSH URLs; query strings and fragments are dropped
+        path = urlparse(url).path.rstrip('/')
+        if path.endswith('.git'):
+            path = path[:-4]
+        name = path.rsplit('/', 1)[-1]
+        if name in ('', '.', '..') or '\\' in name or os.sep in name:
+            raise ValueError(f"Cannot determine repository name from URL: {url}")
+        return name
     
     def clone(self) -> Path:
         """
@@ -115,140 +504,339 @@ class RepositoryIngestor:
         Returns:
             Path to the cloned repository
         """
-        # Clean existing directory if present
-        if self.repo_path.exists():
-            shutil.rmtree(self.repo_path)
-        
-        # Ensure workspace exists
-        self.workspace_dir.mkdir(parents=True, exist_ok=True)
+        options = self._prepare_clone()
         
-        print(f"[Ingestor] Cloning {self.repo_url} to {self.repo_path}")
-        self._repo = Repo.clone_from(self.repo_url, self.repo_path)
+        self._repo = Repo.clone_from(self.repo_url, self.repo_path, multi_options=options)
+        self._ingest_cache = None
+        self._context = None
         print(f"[Ingestor] Clone complete")
         
         return self.repo_path
     
-    async def clone_async(self) -> Path:
-        """Clone the repository asynchronously."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.clone)
-    
-    def _should_ignore(self, path: Path) -> bool:
-        """Check if a path should be ignored."""
-        name = path.name
+    async def clone_async(self, prefetch: bool = True) -> Path:
+        """
+        Clone the repository asynchronously.
         
-        # Check direct matches
-        if name in self.DEFAULT_IGNORE:
-            return True
+        Runs `git clone` as a subprocess on the event loop instead of holding
+        an executor thread for the whole transfer.
+        
+        Args:
+            prefetch: Start ingesting in a worker thread as soon as the
+                checkout completes, overlapping it with whatever the caller
+                does next. get_full_context()/build_repo_map() then wait for
+                the running ingest instead of starting another one.
+            
+        Returns:
+            Path to the cloned repository
+        """
+        options = self._prepare_clone()
+        command = ['git', 'clone', *options, '--', self.repo_url, str(self.repo_path)]
         
-        # Check patterns (e.g., *.pyc)
-        for pattern in self.DEFAULT_IGNORE:
-            if pattern.startswith('*') and name.endswith(pattern[1:]):
-                return True
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise git.GitCommandError(command, process.returncode, stderr)
+        
+        self._repo = Repo(self.repo_path)
+        self._ingest_cache = None
+        self._context = None
+        print(f"[Ingestor] Clone complete")
+        
+        if prefetch:
+            self._ingest_task = asyncio.create_task(asyncio.to_thread(self._ingest_once))
+            self._ingest_task.add_done_callback(self._on_prefetch_done)
         
-        return False
+        return self.repo_path
     
-    def _is_code_file(self, path: Path) -> bool:
-        """Check if a file is a code file."""
-        suffix = path.suffix.lower()
-        name = path.name.lower()
+    def _prepare_clone(self) -> List[str]:
+        """
+        Clear any previous checkout and build the git clone options.
         
+        Returns:
+            Options to pass to git clone
+        """
+        # Ensure workspace exists
+        self.workspace_dir.mkdir(parents=True, exist_ok=True)
+        
+        if self._owns_repo_path:
+            # Re-clone: clear this ingestor's previous checkout
+            if self.repo_path.exists():
+                shutil.rmtree(self.repo_path)
+        else:
+            # git clones into the empty directory
+            self.repo_path = Path(tempfile.mkdtemp(
+                prefix=f"{self.repo_name}-", dir=self.workspace_dir
+            ))
+            self._owns_repo_path = True
+        
+        print(f"[Ingestor] Cloning {self.repo_url} to {self.repo_path}")
+        options = list(self.CLONE_OPTIONS)
+        if self.branch:
+            options.append(f"--branch={self.branch}")
+        return options
+    
+    @staticmethod
+    def _on_prefetch_done(task: asyncio.Task):
+        """Report a failed prefetch; the next synchronous call retries and raises."""
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[Ingestor] Warning: Background ingest failed: {task.exception()}")
+    
+    def _should_ignore(self, name: str) -> bool:
+        """Check if a file or directory name should be ignored."""
+        # Check direct matches, then patterns (e.g., *.pyc)
+        return name in self.IGNORE_NAMES or name.endswith(self.IGNORE_SUFFIXES)
+    
+    def _is_code_file(self, name: str, suffix: str) -> bool:
+        """Check if a file is a code file, given its name and lowercase extension."""
         # Check extension
         if suffix in self.CODE_EXTENSIONS:
             return True
         
         # Check special files without extensions
-        if name in {'dockerfile', 'makefile', 'rakefile', 'gemfile', 'procfile'}:
-            return True
+        return name.lower() in self.SPECIAL_CODE_FILES
+    
+    def _detect_language(self, name: str) -> str:
+        """Detect programming language from a file name's extension."""
+        suffix = os.path.splitext(name)[1].lower()
+        
+        return self.LANGUAGE_MAP.get(suffix, 'unknown')
+    
+    def _enumerate_files(self) -> List[os.DirEntry]:
+        """
+        List the code files to ingest, skipping ignored paths.
+        
+        Walks with os.scandir and returns the DirEntry objects so their
+        cached stat results can be reused. Files in a directory come
+        before those in its subdirectories, matching os.walk order.
+        """
+        files: List[os.DirEntry] = []
+        pending: List[str] = [str(self.repo_path)]
+        
+        while pending:
+            subdirs: List[str] = []
+            
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        
+                        if self._should_ignore(entry.name):
+                            continue
+                        
+                        if is_dir:
+                            # Like os.walk, do not follow directory symlinks
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        elif self._is_code_file(entry.name, os.path.splitext(entry.name)[1].lower()):
+                            files.append(entry)
+            except OSError as e:
+                print(f"[Ingestor] Warning: Could not list directory: {e}")
+            
+            pending.extend(reversed(subdirs))
+        
+        return files
+    
+    def _read_and_scan(
+        self,
+        path: str,
+        file_name: str,
+        language: str
+    ) -> Optional[Tuple[str, Set[str], Set[int], bool]]:
+        """
+        Read a file and scan it for environment variables and ports.
+        
+        Args:
+            path: Path of the file
+            file_name: Name of the file
+            language: Language detected from the file extension
+            
+        Returns:
+            Tuple of (content, env vars, ports, whether CRs were normalized),
+            or None if the file cannot be read
+        """
+        result = self._read_text(path)
+        if result is None:
+            return None
+        content, cr_normalized = result
+        
+        env_vars: Set[str] = set()
+        ports: Set[int] = set()
         
-        return False
-    
-    def _detect_language(self, path: Path) -> str:
-        """Detect programming language from file extension."""
-        suffix = path.suffix.lower()
-        
-        language_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-            '.jsx': 'javascript',
-            '.java': 'java',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.rb': 'ruby',
-            '.php': 'php',
-            '.c': 'c',
-            '.cpp': 'cpp',
-            '.cs': 'csharp',
-            '.swift': 'swift',
-            '.kt': 'kotlin',
-            '.scala': 'scala',
-            '.vue': 'vue',
-            '.svelte': 'svelte',
-            '.html': 'html',
-            '.css': 'css',
-            '.sql': 'sql',
-            '.sh': 'shell',
-            '.yaml': 'yaml',
-            '.yml': 'yaml',
-            '.json': 'json',
-            '.tf': 'terraform',
-            '.hcl': 'hcl',
-            '.md': 'markdown',
-        }
-        
-        return language_map.get(suffix, 'unknown')
+        try:
+            scan_text = self._scan_window(file_name, content)
+            
+            # Python files are parsed so lookups the regexes miss
+            # (e.g. os.environ.get) are found
+            if scan_text is not None and (
+                language != 'python' or not self._scan_python(content, env_vars, ports)
+            ):
+                self._scan_signals(scan_text, env_vars, ports)
+        except Exception as e:
+            print(f"[Ingestor] Warning: Could not scan {path}: {e}")
+        
+        return content, env_vars, ports, cr_normalized
+    
+    def _read_text(self, path: str) -> Optional[Tuple[str, bool]]:
+        """Read a file as text, returning None if it cannot be read."""
+        try:
+            return self._read_file_fast(path)
+        except Exception as e:
+            print(f"[Ingestor] Warning: Could not read {path}: {e}")
+            return None
+    
+    def _read_file_fast(self, path: str) -> Tuple[str, bool]:
+        """
+        Read a file as UTF-8 without the buffered text-IO stack.
+        
+        Small files take a single os.read() sized from fstat; large ones are
+        decoded straight from an mmap of the page cache.
+        
+        Returns:
+            Tuple of (text, whether CRs were normalized to LF)
+        """
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            size = os.fstat(fd).st_size
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            
+            if size >= self.MMAP_THRESHOLD:
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                    text = str(mm, 'utf-8', 'ignore')
+            else:
+                text = os.read(fd, size).decode('utf-8', 'ignore')
+        finally:
+            os.close(fd)
+        
+        # Match text-mode universal newlines
+        if '\r' in text:
+            return text.replace('\r\n', '\n').replace('\r', '\n'), True
+        return text, False
     
     def get_full_context(self) -> str:
         """
         Concatenate the entire codebase into a single string for Gemini.
-        Uses caching to avoid re-reading files.
+        Uses caching to avoid re-reading files; the string is only joined
+        the first time it is requested.
         
         Returns:
             Concatenated codebase as a string
         """
-        if self._context_cache is not None:
-            return self._context_cache
+        if self._context is None:
+            self._context = "".join(self.iter_context())
+        return self._context
+    
+    def iter_context(self) -> Iterator[str]:
+        """
+        Yield the codebase context piece by piece, without building the
+        concatenated string. Joining the pieces gives get_full_context().
         
-        if not self.repo_path.exists():
-            raise ValueError("Repository not cloned. Call clone() first.")
+        Yields:
+            File headers, file contents, footers and separators in order
+        """
+        if self._context is not None:
+            yield self._context
+            return
+        
+        for index, (header, content, footer) in enumerate(self._ingest_once()[0]):
+            if index:
+                yield "\n"
+            yield header
+            yield content
+            yield "\n"
+            yield footer
+    
+    def write_context_to(self, out_fd: int) -> int:
+        """
+        Write the codebase context, UTF-8 encoded, to a file descriptor.
         
-        context_parts: List[str] = []
+        Files whose content is byte-identical on disk (ASCII, no CRs
+        normalized, nothing dropped) are copied with os.sendfile, so their bytes never
+        pass through Python. Other files are encoded from the ingested text.
+        The output matches get_full_context().encode('utf-8').
         
-        for root, dirs, files in os.walk(self.repo_path):
-            root_path = Path(root)
+        Args:
+            out_fd: Open file descriptor to write to (file, pipe or socket)
             
-            # Filter out ignored directories (in-place modification)
-            dirs[:] = [d for d in dirs if not self._should_ignore(root_path / d)]
+        Returns:
+            Number of bytes written
+        """
+        context_parts, repo_map = self._ingest_once()
+        use_sendfile = hasattr(os, 'sendfile')
+        written = 0
+        
+        for index, ((header, content, footer), mapping) in enumerate(
+            zip(context_parts, repo_map.file_mappings)
+        ):
+            written += self._write_all(out_fd, (("\n" if index else "") + header).encode())
             
-            for file_name in files:
-                file_path = root_path / file_name
-                
-                # Skip ignored files
-                if self._should_ignore(file_path):
-                    continue
-                
-                # Only include code files
-                if not self._is_code_file(file_path):
-                    continue
-                
-                # Read and append file content
-                try:
-                    relative_path = file_path.relative_to(self.repo_path)
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        context_parts.append(
-                            f"--- FILE: {relative_path} ---\n"
-                            f"{content}\n"
-                            f"--- END FILE: {relative_path} ---\n"
-                        )
-                except Exception as e:
-                    print(f"[Ingestor] Warning: Could not read {file_path}: {e}")
-                    continue
+            # len == size only holds for ASCII text when no CRLF or invalid
+            # bytes were dropped while reading; str.isascii() is O(1). A lone
+            # CR rewritten to LF keeps the length, so those files are tracked
+            if (
+                use_sendfile
+                and content.isascii()
+                and len(content) == mapping.size_bytes
+                and mapping.path not in self._cr_normalized
+            ):
+                sent = self._sendfile_all(out_fd, self.repo_path / mapping.path, len(content))
+            else:
+                sent = None
+            if sent is None:
+                sent = self._write_all(out_fd, content.encode())
+            written += sent
+            
+            written += self._write_all(out_fd, ("\n" + footer).encode())
+        
+        return written
+    
+    @staticmethod
+    def _write_all(fd: int, data: bytes) -> int:
+        """Write all of data to fd, retrying short writes."""
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        return len(data)
+    
+    @staticmethod
+    def _sendfile_all(out_fd: int, path: Path, count: int) -> Optional[int]:
+        """
+        Copy count bytes of a file to out_fd in the kernel.
+        
+        Returns:
+            Number of bytes sent, or None if nothing was sent and the
+            caller should write the content itself
+        """
+        try:
+            in_fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        
+        offset = 0
+        try:
+            while offset < count:
+                sent = os.sendfile(out_fd, in_fd, offset, count - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError:
+            if offset == 0:
+                return None
+            raise
+        finally:
+            os.close(in_fd)
         
-        self._context_cache = "\n".join(context_parts)
-        return self._context_cache
+        if offset < count:
+            # File shrank since it was read; cannot fall back mid-block
+            raise OSError(f"Short sendfile for {path}: {offset} of {count} bytes")
+        return offset
     
     def read_guidelines(self) -> str:
         """
@@ -280,9 +868,44 @@ class RepositoryIngestor:
         Returns:
             RepoMap with project metadata
         """
+        return self._ingest_once()[1]
+    
+    def _ingest_once(self) -> Tuple[List[Tuple[str, str, str]], RepoMap]:
+        """
+        Ingest the repository once and cache the result for subsequent
+        calls. Safe to call from several threads; a prefetch started by
+        clone_async() is waited for rather than repeated.
+        
+        Returns:
+            Tuple of (per-file (header, content, footer) blocks, RepoMap)
+        """
+        if self._ingest_cache is not None:
+            return self._ingest_cache
+        
+        with self._ingest_lock:
+            if self._ingest_cache is None:
+                self._ingest_cache = self._ingest()
+            return self._ingest_cache
+    
+    def _ingest(self) -> Tuple[List[Tuple[str, str, str]], RepoMap]:
+        """
+        Walk and read the repository a single time, producing both the
+        Gemini context blocks and the RepoMap from the same file contents.
+        
+        Returns:
+            Tuple of (per-file (header, content, footer) blocks, RepoMap)
+        """
         if not self.repo_path.exists():
             raise ValueError("Repository not cloned. Call clone() first.")
         
+        cache_path = self._disk_cache_path()
+        if cache_path is not None:
+            cached = self._load_disk_cache(cache_path)
+            if cached is not None:
+                return cached
+        
+        context_parts: List[Tuple[str, str, str]] = []
+        cr_normalized: Set[str] = set()
         file_mappings: List[FileMapping] = []
         language_counts: dict[str, int] = {}
         detected_deps: List[DependencyInfo] = []
@@ -292,26 +915,59 @@ class RepositoryIngestor:
         primary_language: str = "unknown"
         entry_point: str = "unknown"
         framework: Optional[str] = None
+        total_chars: int = 0
+        
+        files = self._enumerate_files()
+        paths = [entry.path for entry in files]
+        names = [entry.name for entry in files]
+        languages = [self._detect_language(name) for name in names]
         
-        for root, dirs, files in os.walk(self.repo_path):
-            root_path = Path(root)
-            dirs[:] = [d for d in dirs if not self._should_ignore(root_path / d)]
+        # Every entry path starts with the repository root, so relative
+        # paths are a plain slice
+        root_len = len(str(self.repo_path)) + len(os.sep)
+        
+        if len(files) >= self.PROCESS_POOL_MIN_FILES:
+            # Scanning is regex/AST work that holds the GIL; spread it across cores
+            executor = ProcessPoolExecutor(
+                max_workers=max(1, (os.cpu_count() or 1) * 3 // 4),
+                mp_context=_POOL_CONTEXT
+            )
+            read_and_scan = _process_file
+            chunksize = 64
+        else:
+            # File reads release the GIL, so a thread pool overlaps them
+            executor = ThreadPoolExecutor(max_workers=self.parallel_reads)
+            read_and_scan = self._read_and_scan
+            chunksize = 1
+        
+        with executor:
+            results = executor.map(read_and_scan, paths, names, languages, chunksize=chunksize)
             
-            for file_name in files:
-                file_path = root_path / file_name
-                
-                if self._should_ignore(file_path) or not self._is_code_file(file_path):
+            for entry, language, result in zip(files, languages, results):
+                if result is None:
                     continue
                 
+                content, file_env_vars, file_ports, file_cr_normalized = result
+                file_name = entry.name
+                
                 try:
-                    relative_path = str(file_path.relative_to(self.repo_path))
-                    language = self._detect_language(file_path)
-                    size = file_path.stat().st_size
+                    relative_path = entry.path[root_len:]
+                    size = entry.stat().st_size
+                    
+                    # Keep the framing separate so file contents are never
+                    # copied; blocks line up one-to-one with file_mappings
+                    header = f"--- FILE: {relative_path} ---\n"
+                    footer = f"--- END FILE: {relative_path} ---\n"
+                    context_parts.append((header, content, footer))
+                    if file_cr_normalized:
+                        cr_normalized.add(relative_path)
+                    total_chars += len(header) + len(content) + 1 + len(footer)
                     
                     # Count languages
                     language_counts[language] = language_counts.get(language, 0) + 1
                     
-                    file_mappings.append(FileMapping(
+                    # Fields are already typed, so skip validation for every file
+                    file_mappings.append(FileMapping.model_construct(
                         path=relative_path,
                         language=language,
                         size_bytes=size
@@ -320,20 +976,19 @@ class RepositoryIngestor:
                     # Check for dependency files
                     if file_name in self.DEPENDENCY_FILES:
                         dependency_file = relative_path
-                        detected_deps.extend(self._parse_dependencies(file_path, file_name))
+                        detected_deps.extend(self._parse_dependencies(content, file_name))
                     
-                    # Scan for env vars and ports
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        detected_env_vars.update(self._find_env_vars(content))
-                        detected_ports.update(self._find_ports(content))
-                        
-                        # Detect framework
-                        if framework is None:
-                            framework = self._detect_framework(content, language)
+                    detected_env_vars.update(file_env_vars)
+                    detected_ports.update(file_ports)
+                    
+                    # Detect framework
+                    if framework is None and language in self.FRAMEWORK_MATCHERS:
+                        scan_text = self._scan_window(file_name, content)
+                        if scan_text is not None:
+                            framework = self._detect_framework(scan_text, language)
                     
                 except Exception as e:
-                    print(f"[Ingestor] Warning: Could not process {file_path}: {e}")
+                    print(f"[Ingestor] Warning: Could not process {entry.path}: {e}")
         
         # Determine primary language
         if language_counts:
@@ -342,11 +997,13 @@ class RepositoryIngestor:
         # Find entry point
         entry_point = self._find_entry_point(primary_language)
         
-        # Estimate token count
-        context = self.get_full_context()
-        token_estimate = len(context) // 4  # Rough estimate: 4 chars per token
+        # Estimate token count from the joined length (blocks plus separators)
+        # without materializing the joined context
+        if context_parts:
+            total_chars += len(context_parts) - 1
+        token_estimate = total_chars // 4  # Rough estimate: 4 chars per token
         
-        return RepoMap(
+        repo_map = RepoMap(
             project_name=self.repo_name,
             primary_language=primary_language,
             framework=framework,
@@ -359,15 +1016,110 @@ class RepositoryIngestor:
             detected_env_vars=list(detected_env_vars),
             detected_ports=list(detected_ports)
         )
+        
+        self._cr_normalized = cr_normalized
+        if cache_path is not None:
+            self._store_disk_cache(cache_path, context_parts, repo_map)
+        return context_parts, repo_map
     
-    def _parse_dependencies(self, path: Path, filename: str) -> List[DependencyInfo]:
-        """Parse dependencies from a dependency file."""
-        deps: List[DependencyInfo] = []
+    def _disk_cache_path(self) -> Optional[Path]:
+        """Get the on-disk cache file for the cloned commit, if caching is enabled."""
+        if self.cache_dir is None:
+            return None
+        
+        try:
+            repo = self._repo or Repo(self.repo_path)
+            sha = repo.head.commit.hexsha
+        except Exception as e:
+            print(f"[Ingestor] Warning: Could not resolve HEAD for caching: {e}")
+            return None
+        
+        return self.cache_dir / f"{self.repo_name}-{sha}-v{self.INGEST_CACHE_VERSION}.json.gz"
+    
+    def _load_disk_cache(self, cache_path: Path) -> Optional[Tuple[List[Tuple[str, str, str]], RepoMap]]:
+        """Load cached context blocks and RepoMap, or None on a miss."""
+        try:
+            with gzip.open(cache_path, 'rb') as f:
+                data = orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[Ingestor] Warning: Ignoring unreadable cache {cache_path}: {e}")
+            return None
+        
+        print(f"[Ingestor] Loaded cached ingest for {self.repo_name}")
+        try:
+            os.utime(cache_path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        context_parts = [tuple(block) for block in data['context']]
+        self._cr_normalized = set(data['cr_normalized'])
+        return context_parts, RepoMap.model_validate(data['repo_map'])
+    
+    def _store_disk_cache(
+        self,
+        cache_path: Path,
+        context_parts: List[Tuple[str, str, str]],
+        repo_map: RepoMap
+    ):
+        """Write the ingest result to the on-disk cache atomically."""
+        payload = orjson.dumps({
+            'context': context_parts,
+            'repo_map': repo_map.model_dump(mode='json'),
+            'cr_normalized': sorted(self._cr_normalized),
+        })
         
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp_path, 'wb', compresslevel=1) as f:
+                f.write(payload)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"[Ingestor] Warning: Could not write cache {cache_path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        
+        self._prune_disk_cache()
+    
+    def _prune_disk_cache(self):
+        """
+        Evict least recently used cache files beyond the per-repository
+        entry limit and the total size limit.
+        """
+        try:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.json.gz') and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+        except OSError as e:
+            print(f"[Ingestor] Warning: Could not scan cache {self.cache_dir}: {e}")
+            return
+        
+        entries.sort(reverse=True)  # Most recently used first
+        repo_entries = 0
+        total_bytes = 0
+        
+        for _, size, path, name in entries:
+            # Names are {repo}-{sha}-v{version}.json.gz
+            is_repo = name.rsplit('-', 2)[0] == self.repo_name
+            repo_entries += is_repo
+            total_bytes += size
             
+            if (is_repo and repo_entries > self.CACHE_MAX_ENTRIES_PER_REPO) \
+                    or total_bytes > self.CACHE_MAX_BYTES:
+                try:
+                    os.unlink(path)
+                    total_bytes -= size
+                except OSError:
+                    pass
+    
+    def _parse_dependencies(self, content: str, filename: str) -> List[DependencyInfo]:
+        """Parse dependencies from a dependency file's content."""
+        deps: List[DependencyInfo] = []
+        
+        try:
             if filename == 'requirements.txt':
                 for line in content.splitlines():
                     line = line.strip()
@@ -390,72 +1142,100 @@ class RepositoryIngestor:
         
         return deps
     
-    def _find_env_vars(self, content: str) -> Set[str]:
-        """Find environment variable references in code."""
-        import re
-        
-        env_vars: Set[str] = set()
+    def _scan_window(self, file_name: str, content: str) -> Optional[str]:
+        """
+        Select the part of a file that is scanned for env vars, ports and
+        framework signatures, bounding regex work per file.
         
-        # Python: os.environ['VAR'], os.getenv('VAR')
-        patterns = [
-            r"os\.environ\[[\'\"](\w+)[\'\"]\]",
-            r"os\.getenv\([\'\"](\w+)[\'\"]",
-            r"process\.env\.(\w+)",  # JavaScript
-            r"ENV\[[\'\"](\w+)[\'\"]\]",  # Ruby
-            r"getenv\([\'\"](\w+)[\'\"]",  # PHP
-        ]
+        Args:
+            file_name: Name of the file
+            content: Full file content
+            
+        Returns:
+            The head (and tail, for large files) of the content, or None
+            if the file looks minified and should not be scanned
+        """
+        head = content[:self.SCAN_HEAD_CHARS]
         
-        for pattern in patterns:
-            matches = re.findall(pattern, content)
-            env_vars.update(matches)
+        if '.min.' in file_name:
+            return None
+        sample = head.split('\n', self.MINIFIED_SAMPLE_LINES)[:self.MINIFIED_SAMPLE_LINES]
+        if max(map(len, sample)) > self.MINIFIED_LINE_LENGTH:
+            return None
         
-        return env_vars
+        if len(content) <= self.SCAN_HEAD_CHARS + self.SCAN_TAIL_CHARS:
+            return content
+        return head + '\n' + content[-self.SCAN_TAIL_CHARS:]
     
-    def _find_ports(self, content: str) -> Set[int]:
-        """Find port numbers in code."""
-        import re
+    def _scan_python(self, content: str, env_vars: Set[str], ports: Set[int]) -> bool:
+        """
+        Find environment variable references and port numbers in Python
+        code by walking its AST.
         
-        ports: Set[int] = set()
+        Args:
+            content: Python source to scan
+            env_vars: Set to add detected environment variable names to
+            ports: Set to add detected port numbers to
+            
+        Returns:
+            False if the source is too large or cannot be parsed, in which
+            case the caller falls back to the regex scanner
+        """
+        if len(content) > self.AST_MAX_CHARS:
+            return False
+        
+        visitor = _EnvPortVisitor()
+        try:
+            with _AST_PARSE_LOCK:
+                tree = ast.parse(content)
+            visitor.visit(tree)
+        except (SyntaxError, ValueError, RecursionError):
+            return False
+        
+        env_vars.update(visitor.envs)
+        ports.update(visitor.ports)
+        return True
+    
+    def _scan_signals(self, content: str, env_vars: Set[str], ports: Set[int]):
+        """
+        Find environment variable references and port numbers in code
+        with a single pass over the content.
         
-        # Common port patterns
-        patterns = [
-            r"port\s*[=:]\s*(\d{4,5})",
-            r"PORT\s*[=:]\s*(\d{4,5})",
-            r"listen\((\d{4,5})",
-            r":(\d{4,5})[/\"\']",
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for match in matches:
-                port = int(match)
+        Args:
+            content: File content to scan
+            env_vars: Set to add detected environment variable names to
+            ports: Set to add detected port numbers to
+        """
+        for match in self.SIGNAL_REGEX.finditer(content):
+            index = match.lastindex
+            value = match.group(index)
+            
+            if self.SIGNAL_PATTERNS[index - 1][0] == 'env':
+                env_vars.add(value)
+            else:
+                port = int(value)
                 if 1024 <= port <= 65535:  # Valid port range
                     ports.add(port)
-        
-        return ports
     
     def _detect_framework(self, content: str, language: str) -> Optional[str]:
         """Detect the framework used in the code."""
-        framework_patterns = {
-            'FastAPI': [r'from fastapi import', r'FastAPI\('],
-            'Flask': [r'from flask import', r'Flask\(__name__\)'],
-            'Django': [r'from django', r'DJANGO_SETTINGS_MODULE'],
-            'Express': [r'require\([\'"]express[\'"]\)', r'from [\'"]express[\'"]'],
-            'Next.js': [r'from [\'"]next', r'next/'],
-            'React': [r'from [\'"]react[\'"]', r'import React'],
-            'Vue': [r'from [\'"]vue[\'"]', r'createApp'],
-            'Spring': [r'@SpringBootApplication', r'springframework'],
-            'Gin': [r'github.com/gin-gonic/gin'],
-            'Actix': [r'actix_web', r'actix-web'],
-        }
+        matcher = self.FRAMEWORK_MATCHERS.get(language)
+        if matcher is None:
+            return None
         
-        import re
-        for framework, patterns in framework_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, content):
-                    return framework
+        regex, frameworks, ranks = matcher
+        best: Optional[int] = None
         
-        return None
+        for match in regex.finditer(content):
+            rank = ranks[match.lastindex - 1]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        
+        if best is None:
+            return None
+        return frameworks[best]
     
     def _find_entry_point(self, language: str) -> str:
         """Find the entry point file for the detected language."""
@@ -474,7 +1254,13 @@ class RepositoryIngestor:
         return "unknown"
     
     def cleanup(self):
-        """Remove the cloned repository."""
-        if self.repo_path.exists():
+        """Remove the cloned repository (and the tmpfs workspace once empty)."""
+        if self._owns_repo_path and self.repo_path.exists():
             shutil.rmtree(self.repo_path)
-            print(f"[Ingestor] Cleaned up {self.repo_path}")
\ No newline at end of file
+            print(f"[Ingestor] Cleaned up {self.repo_path}")
+        
+        if self._owns_workspace:
+            try:
+                self.workspace_dir.rmdir()
+            except OSError:
+                pass  # Missing, or still holds another ingestor's clone
\ No newline at end of file
@@ -8,7 +8,7 @@ Defines the core data models for:
 - Reasoning audit trail (ThoughtSignature)
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Literal
 from datetime import datetime
 from enum import Enum
@@ -45,6 +45,8 @@ class FixStatus(str, Enum):
 # ============================================
 class FileMapping(BaseModel):
     """Mapping of a single file in the repository."""
+    model_config = ConfigDict(frozen=True)
+    
     path: str = Field(..., description="Relative path from repo root")
     language: str = Field(..., description="Detected programming language")
     size_bytes: int = Field(..., description="File size in bytes")
@@ -53,6 +55,8 @@ class FileMapping(BaseModel):
 
 class DependencyInfo(BaseModel):
     """Detected dependency information."""
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     version: Optional[str] = None
     source: str = Field(..., description="e.g., requirements.txt, package.json")
@@ -206,6 +210,8 @@ class FixProposal(BaseModel):
     Human-in-the-Loop fix proposal from Phase C: Self-Healing Loop.
     Presented to user for approval before application.
     """
+    model_config = ConfigDict(frozen=True)
+    
     id: str = Field(..., description="Unique fix proposal ID")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -246,6 +252,8 @@ class FixProposal(BaseModel):
 # ============================================
 class Thought(BaseModel):
     """A single thought in the Thought Stream."""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     type: Literal["reasoning", "action", "error", "system"]
@@ -255,6 +263,8 @@ class Thought(BaseModel):
 
 class SystemState(BaseModel):
     """Complete system state for dashboard synchronization."""
+    model_config = ConfigDict(frozen=True)
+    
     agent_state: AgentState = Field(AgentState.IDLE)
     current_task: Optional[str] = Field(None)
     token_usage: Dict[str, int] = Field(default_factory=lambda: {"current": 0, "max": 1000000})
@@ -125,6 +125,12 @@ export default function Dashboard() {
       setThoughts(prev => [...prev, thought]);
     });
 
+    // Several thoughts queued at once arrive in a single frame
+    const onThoughtBatch = (batch: Thought[]) => {
+      setThoughts(prev => [...prev, ...batch]);
+    };
+    socket.on('thought_batch', onThoughtBatch);
+
     const unsubNode = socketManager.onNodeUpdate((node) => {
       setNodes(prev => prev.map(n => n.id === node.id ? node : n));
     });
@@ -152,6 +158,7 @@ export default function Dashboard() {
     return () => {
       unsubState();
       unsubThought();
+      socket.off('thought_batch', onThoughtBatch);
       unsubNode();
       unsubSystem();
       socketManager.disconnect();
@@ -53,6 +53,7 @@ export interface SocketEvents {
     // Server -> Client
     'agent_state': (data: AgentStateUpdate) => void;
     'thought_update': (data: Thought) => void;
+    'thought_batch': (data: Thought[]) => void;
     'node_update': (data: InfrastructureNode) => void;
     'system_state': (data: SystemState) => void;
 }
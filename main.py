@@ -6,14 +6,21 @@ Provides endpoints for repository analysis, deployment, and self-healing operati
 """
 
 import os
+import time
 import asyncio
-from datetime import datetime
+import secrets
+from collections import deque
+from itertools import count, islice
+from datetime import datetime, timezone
 from typing import Optional
 from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+import orjson
 import socketio
 
 from core.schema import (
@@ -25,6 +32,11 @@ from core.schema import (
     AgentState,
     Thought,
     FixProposal,
+    FixStatus,
+    CodePatch,
+    AssistModeMetadata,
+    ThoughtSignature,
+    RiskLevel,
     RepoMap,
     DeploymentPlan,
 )
@@ -34,64 +46,227 @@ from core.deployment_logic import SovereignSurgeon
 # Load environment variables
 load_dotenv()
 
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Browser origins allowed to call the API and open Socket.IO connections
+ALLOWED_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("FRONTEND_URL", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+SENTINEL_DEBUG = os.getenv("SENTINEL_DEBUG", "").lower() in ("1", "true", "yes")
+
+# ============================================
+# JSON Encoding
+# ============================================
+class OrjsonCodec:
+    """orjson adapter for the `json` hook of python-socketio/python-engineio."""
+    
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        # orjson output is always compact, matching the separators socketio asks for
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC).decode()
+    
+    loads = staticmethod(orjson.loads)
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC)
+
+
 # ============================================
 # Socket.IO Setup for Real-time Communication
 # ============================================
 sio = socketio.AsyncServer(
     async_mode='asgi',
-    cors_allowed_origins='*',
-    logger=True,
-    engineio_logger=True
+    json=OrjsonCodec,
+    cors_allowed_origins=ALLOWED_ORIGINS,
+    # Per-frame Socket.IO/Engine.IO logging is costly; enable only for debugging
+    logger=SENTINEL_DEBUG,
+    engineio_logger=SENTINEL_DEBUG
 )
 
+# Thought and fix IDs: a per-process random prefix plus a counter keeps
+# them unique across restarts without reading the clock
+_ID_PREFIX = secrets.token_hex(3)
+_thought_counter = count()
+_fix_counter = count()
+
+# Last ISO timestamp handed out by _iso_now, and the millisecond it is for
+_last_iso_ms: int = -1
+_last_iso: str = ""
+
+
+def _iso_now() -> str:
+    """Current UTC time in ISO 8601, reused for calls within the same millisecond."""
+    global _last_iso_ms, _last_iso
+    now_ns = time.time_ns()
+    now_ms = now_ns // 1_000_000
+    if now_ms != _last_iso_ms:
+        _last_iso = datetime.fromtimestamp(now_ns / 1e9, timezone.utc).isoformat()
+        _last_iso_ms = now_ms
+    return _last_iso
+
 # Global state management
 class SentinelState:
     """Global state container for the NEURO-SENTINEL agent."""
+    
+    __slots__ = (
+        'agent_state',
+        'current_repo_map',
+        'current_deployment_plan',
+        'pending_fixes',
+        '_fix_ids',
+        '_fix_dumps',
+        'fix_history',
+        'thoughts',
+        '_thought_out',
+        '_thought_wake',
+        'token_usage',
+        'active_node_id',
+        '_state_cache',
+        '_state_cache_ts',
+    )
+    
+    # Seconds a serialized system state is reused while nothing changes
+    STATE_CACHE_TTL: float = 0.25
+    
+    # Fix proposals awaiting review; the oldest is dropped beyond this
+    MAX_PENDING_FIXES: int = 100
+    
+    # Reviewed (applied/rejected) fixes kept for reference
+    FIX_HISTORY_SIZE: int = 100
+    
     def __init__(self):
         self.agent_state: AgentState = AgentState.IDLE
         self.current_repo_map: Optional[RepoMap] = None
         self.current_deployment_plan: Optional[DeploymentPlan] = None
         self.pending_fixes: dict[str, FixProposal] = {}
-        self.thoughts: list[Thought] = []
+        self._fix_ids: list[str] = []  # pending_fixes keys, in insertion order
+        self._fix_dumps: dict[str, dict] = {}  # Serialized fixes, dropped on change
+        self.fix_history: deque[FixProposal] = deque(maxlen=self.FIX_HISTORY_SIZE)
+        self.thoughts: deque[Thought] = deque(maxlen=100)  # Oldest evicted automatically
+        # Thoughts waiting for the broadcast writer task (see thought_writer)
+        self._thought_out: deque[Thought] = deque(maxlen=100)
+        self._thought_wake = asyncio.Event()
         self.token_usage: dict[str, int] = {"current": 0, "max": 1000000}
         self.active_node_id: Optional[str] = None
+        self._state_cache: Optional[dict] = None
+        self._state_cache_ts: float = 0.0
     
     def add_thought(self, thought_type: str, content: str, signature: Optional[str] = None) -> Thought:
-        """Add a new thought to the stream."""
+        """Add a new thought to the stream and queue it for broadcast."""
         thought = Thought(
-            id=f"thought-{datetime.utcnow().timestamp()}",
-            timestamp=datetime.utcnow(),
+            id=f"thought-{_ID_PREFIX}-{next(_thought_counter)}",
+            timestamp=datetime.now(timezone.utc),
             type=thought_type,
             content=content,
             signature=signature
         )
         self.thoughts.append(thought)
-        # Keep only last 100 thoughts
-        if len(self.thoughts) > 100:
-            self.thoughts = self.thoughts[-100:]
+        self._thought_out.append(thought)
+        self._thought_wake.set()
+        self.invalidate_state()
         return thought
     
+    def drain_thoughts(self) -> list[Thought]:
+        """Take every thought queued for broadcast since the last drain."""
+        batch = list(self._thought_out)
+        self._thought_out.clear()
+        return batch
+    
     def get_system_state(self) -> SystemState:
         """Get current system state for dashboard sync."""
         return SystemState(
             agent_state=self.agent_state,
             token_usage=self.token_usage,
             active_node_id=self.active_node_id,
-            recent_thoughts=self.thoughts[-50:],
-            pending_fixes=list(self.pending_fixes.keys())
+            recent_thoughts=list(islice(self.thoughts, max(0, len(self.thoughts) - 50), None)),
+            pending_fixes=self._fix_ids
         )
+    
+    def get_system_state_dump(self) -> dict:
+        """
+        Get the current system state as a JSON-ready dict.
+        
+        The dump is reused for STATE_CACHE_TTL seconds and dropped as soon
+        as the state changes, so repeated dashboard syncs share one
+        serialization.
+        """
+        now = time.monotonic()
+        if self._state_cache is None or now - self._state_cache_ts >= self.STATE_CACHE_TTL:
+            self._state_cache = self.get_system_state().model_dump(mode="json")
+            self._state_cache_ts = now
+        return self._state_cache
+    
+    def invalidate_state(self):
+        """Drop the cached system state dump after a mutation."""
+        self._state_cache = None
+    
+    def add_fix(self, fix: FixProposal):
+        """Register a fix proposal awaiting approval."""
+        if fix.id not in self.pending_fixes:
+            if len(self._fix_ids) >= self.MAX_PENDING_FIXES:
+                self.remove_fix(self._fix_ids[0])
+            self._fix_ids.append(fix.id)
+        self.pending_fixes[fix.id] = fix
+        self._fix_dumps.pop(fix.id, None)
+        self.invalidate_state()
+    
+    def remove_fix(self, fix_id: str) -> Optional[FixProposal]:
+        """Remove a fix proposal, returning it if it was registered."""
+        fix = self.pending_fixes.pop(fix_id, None)
+        if fix is not None:
+            self._fix_ids.remove(fix_id)
+            self._fix_dumps.pop(fix_id, None)
+            self.invalidate_state()
+        return fix
+    
+    def archive_fix(self, fix: FixProposal):
+        """Move a reviewed fix proposal out of the pending set into history."""
+        self.remove_fix(fix.id)
+        self.fix_history.append(fix)
+    
+    def pending_fix_ids(self) -> list[str]:
+        """IDs of fix proposals awaiting review, oldest first."""
+        return list(self._fix_ids)
+    
+    def get_fix_dump(self, fix_id: str) -> dict:
+        """Get a pending fix proposal as a JSON-ready dict, serialized once per change."""
+        dump = self._fix_dumps.get(fix_id)
+        if dump is None:
+            dump = self._fix_dumps[fix_id] = self.pending_fixes[fix_id].model_dump(mode="json")
+        return dump
 
 sentinel_state = SentinelState()
 
 # ============================================
 # Socket.IO Event Handlers
 # ============================================
+# Broadcast rooms a client can subscribe to with ?subscribe=thoughts,fixes
+# on the connection URL; clients that do not ask get all of them
+SUBSCRIPTION_ROOMS = ('thoughts', 'state', 'fixes')
+
 @sio.event
 async def connect(sid, environ):
     """Handle new client connection."""
     print(f"[Socket.IO] Client connected: {sid}")
+    
+    query = parse_qs(environ.get('QUERY_STRING', ''))
+    requested = {
+        room.strip()
+        for value in query.get('subscribe', [])
+        for room in value.split(',')
+    }
+    for room in SUBSCRIPTION_ROOMS:
+        if not requested or room in requested:
+            await sio.enter_room(sid, room)
+    
     # Send current system state
-    await sio.emit('system_state', sentinel_state.get_system_state().model_dump(), room=sid)
+    await sio.emit('system_state', sentinel_state.get_system_state_dump(), room=sid)
 
 @sio.event
 async def disconnect(sid):
@@ -101,24 +276,106 @@ async def disconnect(sid):
 @sio.event
 async def request_state(sid):
     """Client requesting current system state."""
-    await sio.emit('system_state', sentinel_state.get_system_state().model_dump(), room=sid)
+    await sio.emit('system_state', sentinel_state.get_system_state_dump(), room=sid)
 
-async def broadcast_thought(thought: Thought):
-    """Broadcast a new thought to all connected clients."""
-    await sio.emit('thought_update', thought.model_dump())
+async def thought_writer():
+    """
+    Broadcast queued thoughts to clients subscribed to thoughts.
+    
+    Runs as a single background task: producers only append to the queue,
+    and every thought added since the last wake-up goes out in one frame
+    ('thought_update' for a single thought, 'thought_batch' for several).
+    """
+    while True:
+        await sentinel_state._thought_wake.wait()
+        sentinel_state._thought_wake.clear()
+        
+        batch = sentinel_state.drain_thoughts()
+        if not batch:
+            continue
+        
+        try:
+            # Dump once in JSON mode; the packet is encoded once for every recipient
+            if len(batch) == 1:
+                await sio.emit('thought_update', batch[0].model_dump(mode="json"), room='thoughts')
+            else:
+                await sio.emit(
+                    'thought_batch',
+                    [thought.model_dump(mode="json") for thought in batch],
+                    room='thoughts'
+                )
+        except Exception as e:
+            print(f"[Socket.IO] Failed to broadcast thoughts: {e}")
 
 async def broadcast_state_change(state: AgentState, thought: Optional[str] = None):
-    """Broadcast agent state change to all clients."""
+    """
+    Broadcast agent state change to clients subscribed to state.
+    
+    Any pending delayed transition is cancelled, so it cannot overwrite
+    this newer state when it fires.
+    """
+    _cancel_pending_transition()
     sentinel_state.agent_state = state
+    sentinel_state.invalidate_state()
     await sio.emit('agent_state', {
-        'state': state.value,
+        'state': state,
         'thought': thought,
-        'timestamp': datetime.utcnow().isoformat()
-    })
+        'timestamp': _iso_now()
+    }, room='state')
 
 async def broadcast_fix_proposal(fix: FixProposal):
-    """Broadcast a new fix proposal for user approval."""
-    await sio.emit('fix_proposal', fix.model_dump())
+    """Broadcast a new fix proposal to clients subscribed to fixes."""
+    await sio.emit('fix_proposal', fix.model_dump(mode="json"), room='fixes')
+
+# The delayed state transition waiting to fire, if any. There is at most one:
+# scheduling another or broadcasting a state change cancels it. The module
+# reference also keeps the task from being garbage collected.
+_pending_transition: Optional[asyncio.Task] = None
+
+def _cancel_pending_transition():
+    """Cancel the pending delayed state transition, if any."""
+    global _pending_transition
+    if _pending_transition is not None:
+        _pending_transition.cancel()
+        _pending_transition = None
+
+async def _delayed_state(
+    delay: float,
+    state: AgentState,
+    message: Optional[str] = None,
+    thought: Optional[tuple] = None
+):
+    """
+    Broadcast a state change after a pause, off the request path.
+    
+    Args:
+        delay: Seconds to wait before broadcasting
+        state: Agent state to switch to
+        message: Optional message sent with the state change
+        thought: Optional (type, content) pair added to the thought stream
+    """
+    global _pending_transition
+    await asyncio.sleep(delay)
+    # Due now: detach first so the broadcast below does not cancel this task
+    _pending_transition = None
+    await broadcast_state_change(state, message)
+    if thought is not None:
+        sentinel_state.add_thought(*thought)
+
+def schedule_state_change(
+    delay: float,
+    state: AgentState,
+    message: Optional[str] = None,
+    thought: Optional[tuple] = None
+):
+    """
+    Schedule a delayed state change without holding the request open.
+    
+    Replaces any transition that is still pending.
+    """
+    global _pending_transition
+    _cancel_pending_transition()
+    _pending_transition = asyncio.create_task(_delayed_state(delay, state, message, thought))
 
 # ============================================
 # Application Lifespan
@@ -128,10 +385,21 @@ async def lifespan(app: FastAPI):
     """Manage application startup and shutdown."""
     # Startup
     print("[NEURO-SENTINEL] Starting up...")
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not configured")
+    
+    # One Sovereign Surgeon for the app lifetime, so the Gemini client and
+    # the analysis cache are shared across requests
+    app.state.surgeon = SovereignSurgeon(api_key=GEMINI_API_KEY)
+    
     sentinel_state.add_thought("system", "NEURO-SENTINEL initialized. Awaiting commands.")
+    writer_task = asyncio.create_task(thought_writer())
     yield
     # Shutdown
     print("[NEURO-SENTINEL] Shutting down...")
+    writer_task.cancel()
+    _cancel_pending_transition()
+    await app.state.surgeon.aclose()
 
 # ============================================
 # FastAPI Application
@@ -140,16 +408,17 @@ app = FastAPI(
     title="NEURO-SENTINEL API",
     description="Sovereign DevOps Agent - Zero-Touch Infrastructure Management",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse
 )
 
 # CORS middleware for frontend
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure for production
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
 )
 
 # Mount Socket.IO
@@ -162,17 +431,19 @@ socket_app = socketio.ASGIApp(sio, other_asgi_app=app)
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {
+    return OrjsonResponse({
         "status": "healthy",
-        "agent_state": sentinel_state.agent_state.value,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+        "agent_state": sentinel_state.agent_state,
+        "timestamp": _iso_now()
+    })
 
 
-@app.get("/state")
+# Endpoints below return their cached JSON-ready dumps as an OrjsonResponse
+# so FastAPI does not walk them again with jsonable_encoder
+@app.get("/state", response_model=SystemState)
 async def get_state():
     """Get current system state."""
-    return sentinel_state.get_system_state().model_dump()
+    return OrjsonResponse(sentinel_state.get_system_state_dump())
 
 
 @app.post("/analyze", response_model=AnalyzeResponse)
@@ -188,39 +459,43 @@ async def analyze_repository(request: AnalyzeRequest):
     try:
         # Update state
         await broadcast_state_change(AgentState.RAPID_PULSE, "Starting repository analysis...")
-        thought = sentinel_state.add_thought("reasoning", f"Analyzing repository: {request.repo_url}")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("reasoning", f"Analyzing repository: {request.repo_url}")
         
         # Initialize ingestor
         ingestor = RepositoryIngestor(request.repo_url)
         
-        # Clone and ingest repository
-        thought = sentinel_state.add_thought("action", "Cloning repository...")
-        await broadcast_thought(thought)
-        await ingestor.clone_async()
-        
-        # Build context
-        thought = sentinel_state.add_thought("reasoning", "Building 1M token context window...")
-        await broadcast_thought(thought)
-        context = ingestor.get_full_context()
-        guidelines = ingestor.read_guidelines() if request.guidelines_content is None else request.guidelines_content
+        try:
+            # Clone and ingest repository
+            sentinel_state.add_thought("action", "Cloning repository...")
+            await ingestor.clone_async()
+            
+            # Build context
+            sentinel_state.add_thought("reasoning", "Building 1M token context window...")
+            # Walking and reading the repository is blocking disk work; keep it
+            # off the event loop so Socket.IO traffic continues meanwhile
+            context = await asyncio.to_thread(ingestor.get_full_context)
+            if request.guidelines_content is None:
+                guidelines = await asyncio.to_thread(ingestor.read_guidelines)
+            else:
+                guidelines = request.guidelines_content
+        finally:
+            # The clone may live on a RAM-backed tmpfs; release it once read,
+            # and also when cloning or reading failed
+            await asyncio.to_thread(ingestor.cleanup)
         
         # Update token usage
         token_count = len(context) // 4  # Rough estimate
         sentinel_state.token_usage["current"] = token_count
+        sentinel_state.invalidate_state()
         
-        # Initialize Sovereign Surgeon
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
-        
-        surgeon = SovereignSurgeon(api_key=api_key)
+        surgeon: SovereignSurgeon = app.state.surgeon
         
         # Generate deployment plan
-        thought = sentinel_state.add_thought("reasoning", "Generating deployment specifications with Gemini 3 Pro...")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("reasoning", "Generating deployment specifications with Gemini 3 Pro...")
         
-        repo_map, deployment_plan = await surgeon.analyze_and_plan(context, guidelines)
+        repo_map, deployment_plan = await surgeon.analyze_and_plan(
+            context, guidelines, token_estimate=token_count
+        )
         
         # Store in state
         sentinel_state.current_repo_map = repo_map
@@ -228,12 +503,10 @@ async def analyze_repository(request: AnalyzeRequest):
         
         # Success
         await broadcast_state_change(AgentState.SUCCESS, "Analysis complete!")
-        thought = sentinel_state.add_thought("system", f"✓ Analysis complete. Detected {repo_map.primary_language} {repo_map.framework or 'application'}.")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("system", f"✓ Analysis complete. Detected {repo_map.primary_language} {repo_map.framework or 'application'}.")
         
         # Return to monitoring
-        await asyncio.sleep(2)
-        await broadcast_state_change(AgentState.BREATHE)
+        schedule_state_change(2, AgentState.BREATHE)
         
         return AnalyzeResponse(
             status="success",
@@ -243,8 +516,7 @@ async def analyze_repository(request: AnalyzeRequest):
         
     except Exception as e:
         await broadcast_state_change(AgentState.STROBE_RED, f"Error: {str(e)}")
-        thought = sentinel_state.add_thought("error", f"Analysis failed: {str(e)}")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("error", f"Analysis failed: {str(e)}")
         
         return AnalyzeResponse(
             status="error",
@@ -273,14 +545,12 @@ async def deploy_application():
     
     # TODO: Implement actual Terraform apply
     # For now, return a placeholder response
-    thought = sentinel_state.add_thought("action", "Executing Terraform apply...")
-    await broadcast_thought(thought)
+    sentinel_state.add_thought("action", "Executing Terraform apply...")
     
-    await asyncio.sleep(2)
-    
-    await broadcast_state_change(AgentState.SUCCESS, "Deployment complete!")
-    thought = sentinel_state.add_thought("system", "✓ Application deployed to Cloud Run.")
-    await broadcast_thought(thought)
+    schedule_state_change(
+        2, AgentState.SUCCESS, "Deployment complete!",
+        ("system", "✓ Application deployed to Cloud Run.")
+    )
     
     return {
         "status": "success",
@@ -292,17 +562,17 @@ async def deploy_application():
 @app.get("/fixes")
 async def get_pending_fixes():
     """Get all pending fix proposals awaiting approval."""
-    return {
-        "pending_fixes": [fix.model_dump() for fix in sentinel_state.pending_fixes.values()]
-    }
+    return OrjsonResponse({
+        "pending_fixes": [sentinel_state.get_fix_dump(fix_id) for fix_id in sentinel_state.pending_fix_ids()]
+    })
 
 
-@app.get("/fixes/{fix_id}")
+@app.get("/fixes/{fix_id}", response_model=FixProposal)
 async def get_fix_proposal(fix_id: str):
     """Get a specific fix proposal by ID."""
     if fix_id not in sentinel_state.pending_fixes:
         raise HTTPException(status_code=404, detail="Fix proposal not found")
-    return sentinel_state.pending_fixes[fix_id].model_dump()
+    return OrjsonResponse(sentinel_state.get_fix_dump(fix_id))
 
 
 @app.post("/fixes/{fix_id}/approve", response_model=FixApprovalResponse)
@@ -319,17 +589,18 @@ async def approve_fix(fix_id: str, request: FixApprovalRequest):
         await broadcast_state_change(AgentState.RAPID_PULSE, f"Applying fix: {fix_id}")
         
         # TODO: Apply the patch and redeploy
-        thought = sentinel_state.add_thought("action", f"Applying patch to {fix.affected_file}...")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("action", f"Applying patch to {fix.affected_file}...")
         
-        fix.status = "applied"
-        fix.reviewed_at = datetime.utcnow()
+        fix = fix.model_copy(update={
+            "status": FixStatus.APPLIED,
+            "reviewed_at": datetime.now(timezone.utc)
+        })
+        sentinel_state.archive_fix(fix)
         
-        await asyncio.sleep(1)
-        
-        await broadcast_state_change(AgentState.SUCCESS, "Fix applied successfully!")
-        thought = sentinel_state.add_thought("system", "✓ Code surgery complete. Redeploying...")
-        await broadcast_thought(thought)
+        schedule_state_change(
+            1, AgentState.SUCCESS, "Fix applied successfully!",
+            ("system", "✓ Code surgery complete. Redeploying...")
+        )
         
         return FixApprovalResponse(
             status="applied",
@@ -338,12 +609,14 @@ async def approve_fix(fix_id: str, request: FixApprovalRequest):
         )
     
     elif request.action == "reject":
-        fix.status = "rejected"
-        fix.rejection_reason = request.rejection_reason
-        fix.reviewed_at = datetime.utcnow()
+        fix = fix.model_copy(update={
+            "status": FixStatus.REJECTED,
+            "rejection_reason": request.rejection_reason,
+            "reviewed_at": datetime.now(timezone.utc)
+        })
+        sentinel_state.archive_fix(fix)
         
-        thought = sentinel_state.add_thought("system", f"Fix {fix_id} rejected by user: {request.rejection_reason}")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("system", f"Fix {fix_id} rejected by user: {request.rejection_reason}")
         
         return FixApprovalResponse(
             status="rejected",
@@ -352,8 +625,7 @@ async def approve_fix(fix_id: str, request: FixApprovalRequest):
     
     elif request.action == "modify":
         # TODO: Apply modified patch
-        thought = sentinel_state.add_thought("action", f"Applying modified patch for {fix_id}...")
-        await broadcast_thought(thought)
+        sentinel_state.add_thought("action", f"Applying modified patch for {fix_id}...")
         
         return FixApprovalResponse(
             status="modified",
@@ -363,6 +635,51 @@ async def approve_fix(fix_id: str, request: FixApprovalRequest):
     raise HTTPException(status_code=400, detail="Invalid action")
 
 
+# Demo fix proposal served by /simulate-error, built and validated once
+_FIX_TEMPLATE = FixProposal(
+    id="",
+    error_type="TypeError",
+    error_message="Cannot read property 'user_id' of undefined",
+    stack_trace="at getUser (core/api.py:142)\nat handleRequest (server.py:89)",
+    affected_file="core/api.py",
+    affected_line=142,
+    diagnosis="The function get_user() is being called without proper null-checking on the user_id parameter. During session timeout, the user_id becomes undefined.",
+    confidence_score=0.92,
+    risk_level=RiskLevel.LOW,
+    patches=[
+        CodePatch(
+            file_path="core/api.py",
+            start_line=142,
+            end_line=145,
+            original_content="def get_user(user_id):\n    return db.users.find_one({'_id': user_id})",
+            patched_content="def get_user(user_id: Optional[str] = None):\n    if not user_id:\n        raise ValueError('user_id is required')\n    return db.users.find_one({'_id': user_id})",
+            diff="- def get_user(user_id):\n+ def get_user(user_id: Optional[str] = None):\n+     if not user_id:\n+         raise ValueError('user_id is required')\n      return db.users.find_one({'_id': user_id})"
+        )
+    ],
+    assist_mode=AssistModeMetadata(
+        what_this_does="Adds a null-check to prevent the function from crashing when called without a user_id. The Optional[str] type hint tells Python that this parameter can be None.",
+        why_its_needed="The crash log shows get_user() was called from server.py:89 during a session timeout, where user_id becomes undefined. This fix handles that edge case gracefully.",
+        potential_implications=[
+            "Callers that relied on silent failure will now get an explicit error",
+            "You may need to add try/catch in server.py:89 to handle this",
+            "No database changes — this is code-only",
+            "Risk Level: LOW — isolated change, easy to rollback"
+        ],
+        learn_more_links=[
+            "https://docs.python.org/3/library/typing.html"
+        ]
+    ),
+    thought_signature=ThoughtSignature(
+        id="SIG-A1B2",
+        reasoning_step="Analyzed stack trace and cross-referenced with codebase",
+        action_taken="Generated null-check patch",
+        verification_method="Type checking and unit test simulation",
+        risk_level=RiskLevel.LOW,
+        context_tokens_used=45000
+    )
+)
+
+
 @app.post("/simulate-error")
 async def simulate_error():
     """
@@ -371,69 +688,18 @@ async def simulate_error():
     """
     await broadcast_state_change(AgentState.STROBE_RED, "Error detected in production!")
     
-    thought = sentinel_state.add_thought("error", "TypeError: Cannot read property 'user_id' of undefined")
-    await broadcast_thought(thought)
-    
-    await asyncio.sleep(1)
+    sentinel_state.add_thought("error", "TypeError: Cannot read property 'user_id' of undefined")
+    sentinel_state.add_thought("reasoning", "Analyzing stack trace in 1M token context...")
     
-    thought = sentinel_state.add_thought("reasoning", "Analyzing stack trace in 1M token context...")
-    await broadcast_thought(thought)
-    
-    await asyncio.sleep(2)
-    
-    # Generate a demo fix proposal
-    from core.schema import (
-        FixProposal, CodePatch, AssistModeMetadata, 
-        ThoughtSignature, RiskLevel, FixStatus
-    )
-    
-    fix = FixProposal(
-        id=f"fix-{datetime.utcnow().timestamp()}",
-        error_type="TypeError",
-        error_message="Cannot read property 'user_id' of undefined",
-        stack_trace="at getUser (core/api.py:142)\nat handleRequest (server.py:89)",
-        affected_file="core/api.py",
-        affected_line=142,
-        diagnosis="The function get_user() is being called without proper null-checking on the user_id parameter. During session timeout, the user_id becomes undefined.",
-        confidence_score=0.92,
-        risk_level=RiskLevel.LOW,
-        patches=[
-            CodePatch(
-                file_path="core/api.py",
-                start_line=142,
-                end_line=145,
-                original_content="def get_user(user_id):\n    return db.users.find_one({'_id': user_id})",
-                patched_content="def get_user(user_id: Optional[str] = None):\n    if not user_id:\n        raise ValueError('user_id is required')\n    return db.users.find_one({'_id': user_id})",
-                diff="- def get_user(user_id):\n+ def get_user(user_id: Optional[str] = None):\n+     if not user_id:\n+         raise ValueError('user_id is required')\n      return db.users.find_one({'_id': user_id})"
-            )
-        ],
-        assist_mode=AssistModeMetadata(
-            what_this_does="Adds a null-check to prevent the function from crashing when called without a user_id. The Optional[str] type hint tells Python that this parameter can be None.",
-            why_its_needed="The crash log shows get_user() was called from server.py:89 during a session timeout, where user_id becomes undefined. This fix handles that edge case gracefully.",
-            potential_implications=[
-                "Callers that relied on silent failure will now get an explicit error",
-                "You may need to add try/catch in server.py:89 to handle this",
-                "No database changes — this is code-only",
-                "Risk Level: LOW — isolated change, easy to rollback"
-            ],
-            learn_more_links=[
-                "https://docs.python.org/3/library/typing.html"
-            ]
-        ),
-        thought_signature=ThoughtSignature(
-            id="SIG-A1B2",
-            reasoning_step="Analyzed stack trace and cross-referenced with codebase",
-            action_taken="Generated null-check patch",
-            verification_method="Type checking and unit test simulation",
-            risk_level=RiskLevel.LOW,
-            context_tokens_used=45000
-        )
-    )
+    # Clone the demo fix proposal; only the identity fields change
+    fix = _FIX_TEMPLATE.model_copy(update={
+        "id": f"fix-{_ID_PREFIX}-{next(_fix_counter)}",
+        "created_at": datetime.now(timezone.utc)
+    })
     
-    sentinel_state.pending_fixes[fix.id] = fix
+    sentinel_state.add_fix(fix)
     
-    thought = sentinel_state.add_thought("action", f"Generated fix proposal: {fix.id}")
-    await broadcast_thought(thought)
+    sentinel_state.add_thought("action", f"Generated fix proposal: {fix.id}")
     
     await broadcast_fix_proposal(fix)
     
@@ -445,7 +711,18 @@ async def simulate_error():
 # ============================================
 # Use socket_app for uvicorn to enable Socket.IO
 # Run with: uvicorn main:socket_app --reload --host 0.0.0.0 --port 8000
+# Run a single worker only: SentinelState (analysis results, pending fixes,
+# thoughts) lives in process memory and Socket.IO long-polling needs sticky
+# sessions, so --workers > 1 breaks the analyze/deploy/approve flow
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(socket_app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    
+    # "auto" selects uvloop and httptools when installed
+    uvicorn.run(
+        socket_app,
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto"
+    )
\ No newline at end of file